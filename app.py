@@ -1,156 +1,440 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from supabase import create_client, Client
+from flask import Blueprint, Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
+from flask import copy_current_request_context, has_request_context
 import os
-from datetime import datetime
+import threading
+import time
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from io import StringIO
+from datetime import date, datetime
+from decimal import Decimal
 from dotenv import load_dotenv
+from markupsafe import Markup
+from cache import CatalogCache
+from changefeed import RESYNC, ChangeFeed
+from metrics import request_metrics
+from snapshot import InventorySnapshot
+from storage import (LOW_STOCK_POLL_INTERVAL, LOW_STOCK_THRESHOLD, SIZE_FILTERS, create_storage, cursor_value,
+                     low_stock_change, sort_column)
+from tire_import import parse_import
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key')
+# Routes hangen aan een blueprint, de app zelf komt uit create_app()
+bp = Blueprint('main', __name__)
 
-# Supabase configuration
-supabase_url = os.getenv('SUPABASE_URL', 'https://tfcgwmxiqgnlyjtpymzy.supabase.co')
-supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-
-# Check if we have the required configuration
-if not supabase_key:
-    print("❌ SUPABASE_SERVICE_ROLE_KEY is niet ingesteld!")
-    print("🔧 Maak een .env bestand aan met je Supabase configuratie:")
-    print("   SUPABASE_URL=https://tfcgwmxiqgnlyjtpymzy.supabase.co")
-    print("   SUPABASE_SERVICE_ROLE_KEY=jouw-service-role-key-hier")
-    print("   Ga naar je Supabase dashboard > Settings > API om de service role key te vinden")
-    exit(1)
-
-supabase: Client = create_client(supabase_url, supabase_key)
+# Aantal rijen per pagina voor overzichten
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', '50'))
 
 class BandenVoorraad:
-    def __init__(self):
-        self.setup_database()
+    def __init__(self, storage=None):
+        # Zonder storage bepaalt STORAGE_ENGINE bij het eerste gebruik welke engine het wordt
+        self._storage = storage
+        self._storage_lock = threading.Lock()
+        self.cache = CatalogCache(
+            max_entries=int(os.getenv('CATALOG_CACHE_SIZE', '256')),
+            ttl=float(os.getenv('CATALOG_CACHE_TTL', '60'))
+        )
+        # Gerenderde tabellen van de homepage en /inventory, per catalogus versie
+        self.fragments = CatalogCache(
+            max_entries=int(os.getenv('FRAGMENT_CACHE_SIZE', '64')),
+            ttl=float(os.getenv('CATALOG_CACHE_TTL', '60'))
+        )
+        # Statistieken uit een compacte snapshot in geheugen i.p.v. een query per request
+        self.use_snapshot = os.getenv('INVENTORY_SNAPSHOT', 'false').lower() in ('1', 'true', 'yes')
+        # Wijzigingen voor open schermen (GET /api/events)
+        self.live = ChangeFeed()
+        self._unsubscribe_changes = None
+        self._reset_executor()
+        # Threads van de parent bestaan niet meer na een fork
+        os.register_at_fork(after_in_child=self._reset_executor)
+    
+    @property
+    def storage(self):
+        """Storage engine (supabase, postgres or sqlite), created on first use"""
+        if self._storage is None:
+            with self._storage_lock:
+                if self._storage is None:
+                    self._storage = create_storage()
+        return self._storage
+    
+    def _reset_executor(self):
+        """Create the read thread pool, again in each forked worker (which has no low-stock watcher yet)"""
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('DB_READ_WORKERS', '4')),
+            thread_name_prefix='db-read'
+        )
+        self._low_stock_watcher = None
     
     def setup_database(self):
-        """Setup database tables if they don't exist"""
-        try:
-            # Test de connectie door een eenvoudige query uit te voeren
-            supabase.table('tires').select('*').limit(1).execute()
-            print("✅ Database connectie succesvol!")
-        except Exception as e:
-            print(f"❌ Database connectie fout: {e}")
-            print("🔧 Controleer je .env bestand:")
-            print("   - SUPABASE_URL moet correct zijn")
-            print("   - SUPABASE_SERVICE_ROLE_KEY moet correct zijn")
-            print("   - Voer database_setup.sql uit in je Supabase SQL Editor")
+        """Check the connection and schema of the configured storage engine"""
+        self.storage.setup()
+    
+    def gather(self, *calls):
+        """Run independent reads concurrently, returns their results in call order"""
+        # Eerste aanroep in deze thread, de rest tegelijk in de thread pool
+        futures = []
+        for call in calls[1:]:
+            if has_request_context():
+                call = copy_current_request_context(call)
+            futures.append(self.executor.submit(request_metrics.wrap(call)))
+        results = [calls[0]()] if calls else []
+        results.extend(future.result() for future in futures)
+        return results
     
-    def get_all_tires(self, condition='all'):
+    def _invalidate(self, *tags):
+        """Drop cached reads and rendered fragments after a write"""
+        self.cache.invalidate(*tags)
+        self.fragments.invalidate(*tags)
+    
+    def listen_for_changes(self):
+        """Keep the cache in sync with writes from every worker through the engine's change feed"""
+        if self._unsubscribe_changes is None:
+            self._unsubscribe_changes = self.storage.subscribe_changes(self.apply_change)
+    
+    def apply_change(self, change):
+        """Invalidate the cache for a row change notified by the database, made by any worker"""
+        # Zelfde tags als de schrijfacties hieronder; eigen wijzigingen komen ook nog eens langs
+        if change is None:
+            # Verbinding was weg, wijzigingen kunnen gemist zijn
+            self.cache.clear()
+            self.fragments.clear()
+            self.live.publish(RESYNC)
+            return
+        self.live.publish(change)
+        if change['op'] == 'LOW_STOCK':
+            # Alleen voor live clients, de rij wijziging zelf komt apart
+            return
+        if change['table'] == 'reservations':
+            self._invalidate('reservations')
+        elif change['op'] == 'INSERT':
+            self._invalidate('tires')
+        elif change['op'] == 'DELETE':
+            self._invalidate(f"tire:{change['id']}", 'tires:stats', 'tires:rows')
+        elif change['stock_only']:
+            self._invalidate(f"tire:{change['id']}", 'tires:stock', 'tires:stats')
+            self._update_snapshot_stock([change])
+        else:
+            self._invalidate('tires', f"tire:{change['id']}")
+    
+    def _publish(self, *changes):
+        """Pass this process's own writes to live clients, unless the database change feed does"""
+        # Zelfde vorm als de payload van notify_catalog_change() in database_setup.sql
+        if self._unsubscribe_changes is None:
+            for change in changes:
+                self.live.publish(change)
+    
+    def _list_tags(self, rows, stock_dependent=False):
+        """Cache tags for a list of tires: every list, plus each tire it contains"""
+        tags = {'tires'}
+        tags.update(f"tire:{tire['id']}" for tire in rows)
+        # Lijsten die op voorraad filteren veranderen ook bij een reservering
+        if stock_dependent:
+            tags.add('tires:stock')
+        return tags
+    
+    def get_all_tires(self, condition='all', limit=None, after=None, before=None):
         """Get all tires, optionally filtered by condition"""
-        query = supabase.table('tires').select('*')
-        if condition != 'all':
-            query = query.eq('condition', condition)
-        return query.order('created_at', desc=True).execute()
+        return self.cache.get_or_load(
+            ('get_all_tires', condition, limit, after, before),
+            lambda: self.storage.get_all_tires(condition, limit, after, before),
+            self._list_tags)
+    
+    def get_tire_by_id(self, tire_id):
+        """Get tire by ID"""
+        # Een onbekend id kan later alsnog bestaan, dus dan ook op 'tires' taggen
+        return self.cache.get_or_load(
+            ('get_tire_by_id', tire_id), lambda: self.storage.get_tire_by_id(tire_id),
+            lambda tire: {f'tire:{tire_id}'} if tire else {'tires', f'tire:{tire_id}'})
+    
+    def get_available_tires(self):
+        """Get tires with stock > 0"""
+        return self.cache.get_or_load(
+            ('get_available_tires',), self.storage.get_available_tires,
+            lambda rows: self._list_tags(rows, stock_dependent=True))
     
     def add_tire(self, data):
-        """Add a new tire to inventory"""
-        return supabase.table('tires').insert(data).execute()
+        """Add a new tire to inventory, returns its id"""
+        try:
+            tire_id = self.storage.add_tire(data)
+        finally:
+            self._invalidate('tires')
+        self._publish({'table': 'tires', 'op': 'INSERT', 'id': tire_id, 'stock': data['stock']})
+        return tire_id
     
     def update_tire(self, tire_id, data):
         """Update tire information"""
-        return supabase.table('tires').update(data).eq('id', tire_id).execute()
+        try:
+            result = self.storage.update_tire(tire_id, data)
+        finally:
+            self._invalidate('tires', f'tire:{tire_id}')
+        self._publish({'table': 'tires', 'op': 'UPDATE', 'id': tire_id,
+                       'stock': data['stock'], 'stock_only': False})
+        return result
     
     def delete_tire(self, tire_id):
         """Delete a tire from inventory"""
-        return supabase.table('tires').delete().eq('id', tire_id).execute()
+        try:
+            result = self.storage.delete_tire(tire_id)
+        finally:
+            # Alleen lijsten waar deze band in stond (en de statistieken) worden ongeldig
+            self._invalidate(f'tire:{tire_id}', 'tires:stats', 'tires:rows')
+        self._publish({'table': 'tires', 'op': 'DELETE', 'id': tire_id})
+        return result
+    
+    def import_tires(self, rows):
+        """Insert rows without an ID and update rows with one, in batches"""
+        try:
+            report = self.storage.import_tires(rows)
+        finally:
+            self._invalidate('tires', 'tires:stock', 'tires:stats',
+                             *(f"tire:{tire['id']}" for _, tire in rows if 'id' in tire))
+        # Nieuwe ids zijn onbekend, open schermen laden alles opnieuw
+        if report['inserted'] or report['updated']:
+            self._publish(RESYNC)
+        return report
     
     def reserve_tire(self, data):
-        """Reserve a tire for a customer"""
-        # First check if tire is available
-        tire = supabase.table('tires').select('*').eq('id', data['tire_id']).execute()
-        if not tire.data or tire.data[0]['stock'] < 1:
-            raise Exception("Tire not available")
-        
-        # Create reservation
-        reservation = supabase.table('reservations').insert(data).execute()
-        
-        # Reduce stock
-        supabase.table('tires').update({'stock': tire.data[0]['stock'] - 1}).eq('id', data['tire_id']).execute()
-        
+        """Reserve a tire for a customer, returns the reservation with remaining_stock"""
+        try:
+            reservation = self.storage.reserve_tire(data)
+        finally:
+            self._invalidate(f"tire:{data['tire_id']}", 'tires:stock')
+        self._update_snapshot_stock([{'id': data['tire_id'], 'stock': reservation['remaining_stock']}])
+        self._publish(
+            {'table': 'tires', 'op': 'UPDATE', 'id': data['tire_id'],
+             'stock': reservation['remaining_stock'], 'stock_only': True},
+            {'table': 'reservations', 'op': 'INSERT', 'id': reservation['id'], 'tire_id': data['tire_id']})
         return reservation
     
-    def get_reservations(self, customer_name=None):
+    def adjust_stock(self, adjustments):
+        """Apply many stock deltas/absolute counts in one transaction, returns the new stock levels"""
+        try:
+            tires = self.storage.adjust_stock(adjustments)
+        finally:
+            self._invalidate('tires:stock', 'tires:stats',
+                             *(f"tire:{adjustment['tire_id']}" for adjustment in adjustments))
+        self._update_snapshot_stock(tires)
+        self._publish(*({'table': 'tires', 'op': 'UPDATE', 'id': tire['id'],
+                         'stock': tire['stock'], 'stock_only': True} for tire in tires))
+        return tires
+    
+    def get_reservations(self, customer_name=None, limit=None, after=None, before=None):
         """Get all reservations, optionally filtered by customer"""
-        query = supabase.table('reservations').select('*, tires(*)')
-        if customer_name:
-            query = query.eq('customer_name', customer_name)
-        return query.order('reservation_date', desc=True).execute()
+        return self.storage.get_reservations(customer_name, limit, after, before)
+    
+    def sort_column(self, search=None):
+        """Column search results are ordered and paged by"""
+        return sort_column(search)
     
-    def search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None):
+    def search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                     size_filter=None, limit=None, after=None, before=None):
         """Search and filter tires"""
-        query = supabase.table('tires').select('*')
-        
-        # Zoeken in merk, maat en type
-        if search:
-            query = query.or_(f'brand.ilike.%{search}%,size.ilike.%{search}%,tire_type.ilike.%{search}%')
-        
-        # Filter op conditie
-        if condition:
-            query = query.eq('condition', condition)
-        
-        # Filter op type
-        if tire_type:
-            query = query.eq('tire_type', tire_type)
-        
-        # Filter op voorraad
-        if stock_filter:
-            if stock_filter == 'in_stock':
-                query = query.gt('stock', 0)
-            elif stock_filter == 'low_stock':
-                query = query.lt('stock', 5).gt('stock', 0)
-            elif stock_filter == 'out_of_stock':
-                query = query.eq('stock', 0)
-        
-        return query.order('created_at', desc=True).execute()
+        return self.cache.get_or_load(
+            ('search_tires', search, condition, tire_type, stock_filter,
+             tuple(sorted((size_filter or {}).items())), limit, after, before),
+            lambda: self.storage.search_tires(search, condition, tire_type, stock_filter,
+                                              size_filter, limit, after, before),
+            lambda rows: self._list_tags(rows, stock_dependent=bool(stock_filter)))
+    
+    def iter_search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                          size_filter=None, page_size=500):
+        """Yield filtered tires without loading them all at once (not cached)"""
+        return self.storage.iter_search_tires(search, condition, tire_type, stock_filter,
+                                              size_filter, page_size)
     
     def get_inventory_stats(self):
         """Get inventory statistics"""
-        all_tires = supabase.table('tires').select('*').execute()
-        
-        if not all_tires.data:
-            return {
-                'total_tires': 0,
-                'new_tires': 0,
-                'used_tires': 0,
-                'total_stock': 0,
-                'low_stock': 0,
-                'out_of_stock': 0
-            }
-        
-        tires = all_tires.data
-        total_stock = sum(tire['stock'] for tire in tires)
-        new_tires = len([t for t in tires if t['condition'] == 'new'])
-        used_tires = len([t for t in tires if t['condition'] == 'used'])
-        low_stock = len([t for t in tires if 0 < t['stock'] < 5])
-        out_of_stock = len([t for t in tires if t['stock'] == 0])
-        
-        return {
-            'total_tires': len(tires),
-            'new_tires': new_tires,
-            'used_tires': used_tires,
-            'total_stock': total_stock,
-            'low_stock': low_stock,
-            'out_of_stock': out_of_stock
-        }
+        if self.use_snapshot:
+            return self.get_snapshot().stats()
+        return self.storage.get_inventory_stats()
+    
+    def get_snapshot(self):
+        """All tires as a compact InventorySnapshot, rebuilt when tires are added, edited or deleted"""
+        # Rijen komen per pagina binnen en worden direct kolommen, de dicts blijven niet bestaan.
+        # Niet op 'tires:stock' getagd: voorraad wijzigingen past _update_snapshot_stock ter plekke toe
+        return self.cache.get_or_load(
+            ('get_snapshot',), lambda: InventorySnapshot.from_rows(self.storage.iter_search_tires()),
+            {'tires', 'tires:rows'})
+    
+    def _update_snapshot_stock(self, tires):
+        """Write new stock levels ({'id', 'stock'}) into the cached snapshot instead of rebuilding it"""
+        if not self.use_snapshot:
+            return
+        found, snapshot = self.cache.get(('get_snapshot',))
+        if found:
+            for tire in tires:
+                snapshot.set_stock(tire['id'], tire['stock'])
+    
+    def get_homepage(self, limit=None, after=None, before=None):
+        """Get one page of tires (all conditions) and the inventory stats in one call"""
+        # Statistieken veranderen bij elke schrijfactie
+        return self.cache.get_or_load(
+            ('get_homepage', limit, after, before),
+            lambda: self.storage.get_homepage(limit, after, before),
+            lambda homepage: self._list_tags(homepage['tires']) | {'tires:stock', 'tires:stats'})
+    
+    def get_low_stock(self, limit=None):
+        """Tires below their own low-stock threshold, lowest stock first"""
+        return self.cache.get_or_load(
+            ('get_low_stock', limit), lambda: self.storage.get_low_stock(limit),
+            lambda rows: self._list_tags(rows, stock_dependent=True))
+    
+    def watch_low_stock(self):
+        """Publish low-stock events to live clients, from one thread per process when no change listener does"""
+        if self._unsubscribe_changes is not None:
+            return
+        with self._storage_lock:
+            if self._low_stock_watcher is None:
+                self._low_stock_watcher = threading.Thread(
+                    target=self._watch_low_stock, name='low-stock', daemon=True)
+                self._low_stock_watcher.start()
+    
+    def _watch_low_stock(self):
+        """Follow the engine's low-stock events for as long as the process runs"""
+        while True:
+            try:
+                for event in self.storage.listen_low_stock():
+                    if event is not None:
+                        self.live.publish(low_stock_change(event))
+            except Exception as e:
+                print(f"⚠️ Lage voorraad volgen mislukt ({e}), opnieuw over {LOW_STOCK_POLL_INTERVAL}s")
+            time.sleep(LOW_STOCK_POLL_INTERVAL)
+            # Intussen gemiste events: open schermen laden opnieuw
+            self.live.publish(RESYNC)
+    
+    # Elke schrijfactie invalideert minstens één van deze tags
+    CATALOG_VERSION_TAGS = {'tires', 'tires:stock', 'tires:stats', 'reservations'}
+    
+    def get_catalog_version(self):
+        """Counts and latest change of tires and reservations, the basis for API ETags"""
+        return self.cache.get_or_load(
+            ('get_catalog_version',), self.storage.get_catalog_version, self.CATALOG_VERSION_TAGS)
+    
+    def current_catalog_version(self):
+        """Catalog version including other processes' writes, for keys of rendered fragments"""
+        if self._unsubscribe_changes is not None:
+            return self.get_catalog_version()
+        # Zonder change listener ziet dit proces schrijfacties van anderen pas na CATALOG_CACHE_TTL,
+        # behalve via de versie zelf: wijkt die af, dan zijn ook de gecachte reads verouderd
+        previous, version = self.cache.reload(
+            ('get_catalog_version',), self.storage.get_catalog_version, self.CATALOG_VERSION_TAGS)
+        if previous is not None and version != previous:
+            self.cache.clear()
+            self.fragments.clear()
+            self.cache.set(('get_catalog_version',), version, self.CATALOG_VERSION_TAGS)
+        return version
 
 # Initialize the application
 banden_voorraad = BandenVoorraad()
 
-@app.route('/')
+def decode_cursor(cursor):
+    """Split a 'value_id' cursor from the query string"""
+    if not cursor:
+        return None
+    value, _, key = cursor.rpartition('_')
+    if not value or not key.isdigit():
+        return None
+    return value, int(key)
+
+def get_size_filter():
+    """Read the size range filters from the query string"""
+    size_filter = {}
+    for name in SIZE_FILTERS:
+        value = request.args.get(name, '')
+        if value.isdigit():
+            size_filter[name] = int(value)
+    return size_filter or None
+
+def get_stock_adjustments(payload):
+    """Validate a stock adjustment payload into [{'tire_id', 'delta'|'stock'}]"""
+    if isinstance(payload, dict):
+        payload = payload.get('adjustments')
+    if not isinstance(payload, list) or not payload:
+        raise Exception("Verwacht een lijst met aanpassingen")
+    
+    adjustments = []
+    seen = set()
+    for number, item in enumerate(payload, start=1):
+        if not isinstance(item, dict) or ('delta' in item) == ('stock' in item):
+            raise Exception(f"Regel {number}: geef tire_id met delta of stock")
+        try:
+            tire_id = int(item['tire_id'])
+            value = int(item['delta'] if 'delta' in item else item['stock'])
+        except (KeyError, TypeError, ValueError):
+            raise Exception(f"Regel {number}: ongeldige tire_id of aantal")
+        if 'stock' in item and value < 0:
+            raise Exception(f"Regel {number}: voorraad kan niet negatief zijn")
+        # Dubbele ids zouden in één UPDATE maar één keer worden toegepast
+        if tire_id in seen:
+            raise Exception(f"Regel {number}: tire_id {tire_id} komt meerdere keren voor")
+        seen.add(tire_id)
+        adjustments.append({'tire_id': tire_id, 'delta' if 'delta' in item else 'stock': value})
+    return adjustments
+
+def paginate(fetch, column):
+    """Fetch one keyset page for the current request, returns (rows, links)"""
+    after = decode_cursor(request.args.get('after'))
+    before = decode_cursor(request.args.get('before'))
+    
+    # Eén rij extra ophalen om te weten of er nog een pagina is
+    rows = fetch(limit=PAGE_SIZE + 1, after=after, before=None if after else before)
+    has_more = len(rows) > PAGE_SIZE
+    if before and not after:
+        rows = rows[-PAGE_SIZE:]
+        has_prev, has_next = has_more, True
+    else:
+        rows = rows[:PAGE_SIZE]
+        has_prev, has_next = after is not None, has_more
+    
+    args = request.args.to_dict()
+    args.pop('after', None)
+    args.pop('before', None)
+    args.update(request.view_args or {})
+    
+    links = {'prev_url': None, 'next_url': None}
+    if rows and has_prev:
+        args['before'] = f"{cursor_value(rows[0][column])}_{rows[0]['id']}"
+        links['prev_url'] = url_for(request.endpoint, **args)
+        del args['before']
+    if rows and has_next:
+        args['after'] = f"{cursor_value(rows[-1][column])}_{rows[-1]['id']}"
+        links['next_url'] = url_for(request.endpoint, **args)
+    return rows, links
+
+@bp.route('/')
 def index():
     """Homepage with overview"""
-    new_tires = banden_voorraad.get_all_tires('new')
-    used_tires = banden_voorraad.get_all_tires('used')
-    return render_template('index.html', new_tires=new_tires.data, used_tires=used_tires.data)
+    def load():
+        homepage = {}
+        
+        def fetch(**page):
+            homepage.update(banden_voorraad.get_homepage(**page))
+            return homepage['tires']
+        
+        # Eén aanroep: een pagina banden plus statistieken, daarna één keer splitsen
+        tires, pages = paginate(fetch, 'created_at')
+        new_tires = []
+        used_tires = []
+        for tire in tires:
+            (new_tires if tire['condition'] == 'new' else used_tires).append(tire)
+        
+        stats = homepage['stats']
+        summary = {
+            'new_tires': stats['new_tires'],
+            'used_tires': stats['used_tires'],
+            'total_stock': stats['total_stock'],
+            'low_stock': stats['low_stock'] + stats['out_of_stock']
+        }
+        return {'new_tires': new_tires, 'used_tires': used_tires, 'pages': pages, 'summary': summary,
+                'low_stock': banden_voorraad.get_low_stock(limit=PAGE_SIZE)}
+    
+    return render_template('index.html', tables=render_fragment('_homepage_tables.html', load))
 
-@app.route('/tires/add', methods=['GET', 'POST'])
+@bp.route('/tires/add', methods=['GET', 'POST'])
 def add_tire():
     """Add new tire to inventory"""
     if request.method == 'POST':
@@ -160,19 +444,62 @@ def add_tire():
             'tire_type': request.form['tire_type'],
             'condition': request.form['condition'],
             'stock': int(request.form['stock']),
-            'price': float(request.form['price']) if request.form['price'] else None
+            'price': float(request.form['price']) if request.form['price'] else None,
+            'low_stock_threshold': (int(request.form['low_stock_threshold'])
+                                    if request.form.get('low_stock_threshold') else LOW_STOCK_THRESHOLD)
         }
         
         try:
             banden_voorraad.add_tire(data)
             flash('Banden succesvol toegevoegd!', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         except Exception as e:
             flash(f'Fout bij toevoegen: {str(e)}', 'error')
     
     return render_template('add_tire.html')
 
-@app.route('/tires/edit/<int:tire_id>', methods=['GET', 'POST'])
+@bp.route('/tires/import', methods=['GET', 'POST'])
+def import_tires():
+    """Bulk import tires from a CSV or JSON file"""
+    report = None
+    if request.method == 'POST':
+        try:
+            if request.is_json:
+                content, filename = request.get_data(as_text=True), 'import.json'
+            else:
+                upload = request.files.get('file')
+                if not upload or not upload.filename:
+                    raise Exception('Geen bestand geselecteerd')
+                content, filename = upload.read().decode('utf-8-sig'), upload.filename
+            
+            rows, errors = parse_import(content, filename)
+            report = banden_voorraad.import_tires(rows)
+            report['errors'] = sorted(errors + report['errors'], key=lambda error: error['row'])
+            report['total'] = len(rows) + len(errors)
+        except Exception as e:
+            if request.is_json:
+                return jsonify({'error': str(e)}), 400
+            flash(f'Fout bij importeren: {str(e)}', 'error')
+        else:
+            if request.is_json:
+                return jsonify(report)
+            flash(f"{report['inserted']} toegevoegd, {report['updated']} bijgewerkt, "
+                  f"{len(report['errors'])} fouten", 'success' if not report['errors'] else 'warning')
+    
+    return render_template('import_tires.html', report=report)
+
+@bp.route('/tires/stock', methods=['POST'])
+def adjust_stock():
+    """Batch stock correction, e.g. after a stock count"""
+    try:
+        adjustments = get_stock_adjustments(request.get_json(silent=True))
+        tires = banden_voorraad.adjust_stock(adjustments)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'tires': tires})
+
+@bp.route('/tires/edit/<int:tire_id>', methods=['GET', 'POST'])
 def edit_tire(tire_id):
     """Edit existing tire"""
     if request.method == 'POST':
@@ -182,25 +509,27 @@ def edit_tire(tire_id):
             'tire_type': request.form['tire_type'],
             'condition': request.form['condition'],
             'stock': int(request.form['stock']),
-            'price': float(request.form['price']) if request.form['price'] else None
+            'price': float(request.form['price']) if request.form['price'] else None,
+            'low_stock_threshold': (int(request.form['low_stock_threshold'])
+                                    if request.form.get('low_stock_threshold') else LOW_STOCK_THRESHOLD)
         }
         
         try:
             banden_voorraad.update_tire(tire_id, data)
             flash('Banden succesvol bijgewerkt!', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         except Exception as e:
             flash(f'Fout bij bijwerken: {str(e)}', 'error')
     
     # Get tire data for form
-    tire = supabase.table('tires').select('*').eq('id', tire_id).execute()
-    if not tire.data:
+    tire = banden_voorraad.get_tire_by_id(tire_id)
+    if not tire:
         flash('Banden niet gevonden!', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
-    return render_template('edit_tire.html', tire=tire.data[0])
+    return render_template('edit_tire.html', tire=tire)
 
-@app.route('/tires/delete/<int:tire_id>', methods=['POST'])
+@bp.route('/tires/delete/<int:tire_id>', methods=['POST'])
 def delete_tire(tire_id):
     """Delete tire from inventory"""
     try:
@@ -209,9 +538,9 @@ def delete_tire(tire_id):
     except Exception as e:
         flash(f'Fout bij verwijderen: {str(e)}', 'error')
     
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/reservations', methods=['GET', 'POST'])
+@bp.route('/reservations', methods=['GET', 'POST'])
 def reservations():
     """Manage reservations"""
     if request.method == 'POST':
@@ -225,27 +554,31 @@ def reservations():
         try:
             banden_voorraad.reserve_tire(data)
             flash('Reservering succesvol gemaakt!', 'success')
-            return redirect(url_for('reservations'))
+            return redirect(url_for('main.reservations'))
         except Exception as e:
             flash(f'Fout bij reserveren: {str(e)}', 'error')
     
-    # Get all reservations and available tires
-    reservations = banden_voorraad.get_reservations()
-    available_tires = supabase.table('tires').select('*').gte('stock', 1).execute()
+    # Get reservations and available tires
+    # Lijst en dropdown zijn onafhankelijk, dus tegelijk ophalen
+    (reservations, pages), available_tires = banden_voorraad.gather(
+        lambda: paginate(banden_voorraad.get_reservations, 'reservation_date'),
+        banden_voorraad.get_available_tires
+    )
     
     return render_template('reservations.html', 
-                         reservations=reservations.data, 
-                         available_tires=available_tires.data)
+                         reservations=reservations, 
+                         available_tires=available_tires,
+                         pages=pages)
 
-@app.route('/reservations/customer/<customer_name>')
+@bp.route('/reservations/customer/<customer_name>')
 def customer_reservations(customer_name):
     """View reservations for specific customer"""
     reservations = banden_voorraad.get_reservations(customer_name)
     return render_template('customer_reservations.html', 
-                         reservations=reservations.data, 
+                         reservations=reservations, 
                          customer_name=customer_name)
 
-@app.route('/inventory')
+@bp.route('/inventory')
 def inventory():
     """Inventory management page with search and filters"""
     search = request.args.get('search', '')
@@ -254,69 +587,246 @@ def inventory():
     stock_filter = request.args.get('stock_filter', '')
     
     # Get filtered tires
-    tires_result = banden_voorraad.search_tires(
-        search=search if search else None,
-        condition=condition if condition else None,
-        tire_type=tire_type if tire_type else None,
-        stock_filter=stock_filter if stock_filter else None
-    )
+    size_filter = get_size_filter()
     
-    # Get statistics
-    stats = banden_voorraad.get_inventory_stats()
+    def load():
+        # Zoekresultaten en statistieken tegelijk ophalen
+        (tires, pages), stats = banden_voorraad.gather(
+            lambda: paginate(lambda **page: banden_voorraad.search_tires(
+                search=search if search else None,
+                condition=condition if condition else None,
+                tire_type=tire_type if tire_type else None,
+                stock_filter=stock_filter if stock_filter else None,
+                size_filter=size_filter,
+                **page
+            ), banden_voorraad.sort_column(search)),
+            banden_voorraad.get_inventory_stats
+        )
+        return {'tires': tires, 'stats': stats, 'pages': pages}
     
-    return render_template('inventory.html', 
-                         tires=tires_result.data,
-                         stats=stats)
+    return render_template('inventory.html', tables=render_fragment('_inventory_tables.html', load))
 
-@app.route('/inventory/export')
+@bp.route('/inventory/export')
 def export_inventory():
     """Export inventory to CSV"""
-    import csv
-    from io import StringIO
-    from flask import Response
-    
     search = request.args.get('search', '')
     condition = request.args.get('condition', '')
     tire_type = request.args.get('tire_type', '')
     stock_filter = request.args.get('stock_filter', '')
     
-    # Get filtered tires
-    tires_result = banden_voorraad.search_tires(
+    # Banden komen per pagina (of via een server-side cursor) binnen en gaan direct als CSV regels naar de client
+    tires = banden_voorraad.iter_search_tires(
         search=search if search else None,
         condition=condition if condition else None,
         tire_type=tire_type if tire_type else None,
-        stock_filter=stock_filter if stock_filter else None
+        stock_filter=stock_filter if stock_filter else None,
+        size_filter=get_size_filter()
     )
     
-    # Create CSV
-    si = StringIO()
-    cw = csv.writer(si)
-    
-    # Write header
-    cw.writerow(['ID', 'Merk', 'Maat', 'Type', 'Conditie', 'Voorraad', 'Prijs', 'Aangemaakt', 'Bijgewerkt'])
-    
-    # Write data
-    for tire in tires_result.data:
-        cw.writerow([
-            tire['id'],
-            tire['brand'],
-            tire['size'],
-            tire['tire_type'],
-            'Nieuw' if tire['condition'] == 'new' else 'Tweedehands',
-            tire['stock'],
-            f"€{tire['price']:.2f}" if tire['price'] else '',
-            tire['created_at'][:10] if tire['created_at'] else '',
-            tire['updated_at'][:10] if tire['updated_at'] else ''
-        ])
-    
-    output = si.getvalue()
-    si.close()
+    def generate():
+        si = StringIO()
+        cw = csv.writer(si)
+        
+        # Write header
+        cw.writerow(['ID', 'Merk', 'Maat', 'Type', 'Conditie', 'Voorraad', 'Prijs', 'Drempel',
+                     'Aangemaakt', 'Bijgewerkt'])
+        yield si.getvalue()
+        si.seek(0)
+        si.truncate(0)
+        
+        # Write data
+        for tire in tires:
+            cw.writerow([
+                tire['id'],
+                tire['brand'],
+                tire['size'],
+                tire['tire_type'],
+                'Nieuw' if tire['condition'] == 'new' else 'Tweedehands',
+                tire['stock'],
+                f"€{tire['price']:.2f}" if tire['price'] else '',
+                tire['low_stock_threshold'],
+                tire['created_at'].strftime('%Y-%m-%d') if tire['created_at'] else '',
+                tire['updated_at'].strftime('%Y-%m-%d') if tire['updated_at'] else ''
+            ])
+            yield si.getvalue()
+            si.seek(0)
+            si.truncate(0)
     
     # Create response
-    response = Response(output, mimetype='text/csv')
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
     response.headers['Content-Disposition'] = 'attachment; filename=voorraad_export.csv'
     
     return response
 
+@bp.route('/cache/stats')
+def cache_stats():
+    """Catalog cache counters as JSON"""
+    return jsonify(banden_voorraad.cache.stats())
+
+def to_json(row):
+    """Row as JSON-safe dict: ISO 8601 timestamps and dates, prices as numbers"""
+    result = {}
+    for key, value in row.items():
+        if key == 'search_text':
+            continue
+        if isinstance(value, dict):
+            value = to_json(value)
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = float(value)
+        result[key] = value
+    return result
+
+def catalog_etag(current=False):
+    """ETag for the catalog version, with current=True also up to date with other processes"""
+    version = banden_voorraad.current_catalog_version() if current else banden_voorraad.get_catalog_version()
+    version = json.dumps(version, sort_keys=True, default=cursor_value)
+    return hashlib.sha1(version.encode('utf-8')).hexdigest()
+
+def render_fragment(name, load):
+    """Render a data-dependent partial once per catalog version and URL, load() only runs on a miss"""
+    # De versie in de key dekt ook schrijfacties van andere processen, de tags ruimen lokaal direct op
+    return banden_voorraad.fragments.get_or_load(
+        (name, catalog_etag(current=True), request.full_path),
+        lambda: Markup(render_template(name, **load())),
+        {'tires', 'tires:stock', 'tires:stats'})
+
+def conditional_json(build):
+    """JSON response with the catalog ETag, 304 without calling build when the client is up to date"""
+    etag = catalog_etag()
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        body = build()
+        if body is None:
+            return jsonify({'error': 'Niet gevonden'}), 404
+        response = jsonify(body)
+    response.set_etag(etag)
+    # Clients mogen de body bewaren, maar moeten altijd eerst met If-None-Match controleren
+    response.cache_control.no_cache = True
+    return response
+
+@bp.route('/api/tires')
+def api_tires():
+    """Tires as JSON, with the same filters and paging as /inventory"""
+    search = request.args.get('search', '')
+    condition = request.args.get('condition', '')
+    tire_type = request.args.get('tire_type', '')
+    stock_filter = request.args.get('stock_filter', '')
+    size_filter = get_size_filter()
+    
+    def build():
+        tires, pages = paginate(lambda **page: banden_voorraad.search_tires(
+            search=search if search else None,
+            condition=condition if condition else None,
+            tire_type=tire_type if tire_type else None,
+            stock_filter=stock_filter if stock_filter else None,
+            size_filter=size_filter,
+            **page
+        ), banden_voorraad.sort_column(search))
+        return {'tires': [to_json(tire) for tire in tires], **pages}
+    
+    return conditional_json(build)
+
+@bp.route('/api/tires/<int:tire_id>')
+def api_tire(tire_id):
+    """One tire as JSON"""
+    def build():
+        tire = banden_voorraad.get_tire_by_id(tire_id)
+        return {'tire': to_json(tire)} if tire else None
+    
+    return conditional_json(build)
+
+@bp.route('/api/reservations')
+def api_reservations():
+    """Reservations as JSON, optionally for one customer (?customer_name=)"""
+    customer_name = request.args.get('customer_name') or None
+    
+    def build():
+        reservations, pages = paginate(
+            lambda **page: banden_voorraad.get_reservations(customer_name, **page), 'reservation_date')
+        return {'reservations': [to_json(reservation) for reservation in reservations], **pages}
+    
+    return conditional_json(build)
+
+@bp.route('/api/stats')
+def api_stats():
+    """Inventory statistics as JSON"""
+    return conditional_json(lambda: {'stats': banden_voorraad.get_inventory_stats()})
+
+@bp.route('/api/low-stock')
+def api_low_stock():
+    """Tires below their low-stock threshold as JSON"""
+    return conditional_json(lambda: {'tires': [to_json(tire) for tire in banden_voorraad.get_low_stock()]})
+
+@bp.route('/api/low-stock/events')
+def api_low_stock_events():
+    """Server-Sent Events: one 'low_stock' event per tire that enters, changes below or leaves its threshold"""
+    # Zelfde feed als /api/events, alleen de lage voorraad events; geen eigen database verbinding
+    banden_voorraad.watch_low_stock()
+    
+    def stream():
+        with banden_voorraad.live.listen() as events:
+            # Direct een eerste regel, zodat de headers niet pas bij het eerste event verstuurd worden
+            yield 'retry: 5000\n\n'
+            for change in events:
+                if change is None:
+                    # Commentaar regel houdt de verbinding (en proxies) open
+                    yield ': keepalive\n\n'
+                elif change is not RESYNC and change['op'] == 'LOW_STOCK':
+                    yield f"event: low_stock\ndata: {json.dumps(change)}\n\n"
+    
+    response = Response(stream(), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    # Nginx zou de stream anders bufferen
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/api/events')
+def api_events():
+    """Server-Sent Events: a 'change' event per tire or reservation row change, a 'low_stock' event per
+    tire that enters, changes below or leaves its threshold, and 'resync' when changes were missed"""
+    banden_voorraad.watch_low_stock()
+    
+    def stream():
+        with banden_voorraad.live.listen() as events:
+            # Direct een eerste regel, zodat de headers niet pas bij de eerste wijziging verstuurd worden
+            yield 'retry: 5000\n\n'
+            for change in events:
+                if change is None:
+                    yield ': keepalive\n\n'
+                elif change is RESYNC:
+                    yield 'event: resync\ndata: {}\n\n'
+                elif change['op'] == 'LOW_STOCK':
+                    yield f"event: low_stock\ndata: {json.dumps(change)}\n\n"
+                else:
+                    yield f"event: change\ndata: {json.dumps(change)}\n\n"
+    
+    response = Response(stream(), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def create_app():
+    """Create the Flask app, database clients connect lazily on first use"""
+    app = Flask(__name__)
+    app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key')
+    request_metrics.init_app(app)
+    request_metrics.register_gauges('catalog_cache', banden_voorraad.cache.stats)
+    request_metrics.register_gauges('fragment_cache', banden_voorraad.fragments.stats)
+    request_metrics.register_gauges('live_events', banden_voorraad.live.stats)
+    # Alleen de postgres engine heeft een connection pool
+    if hasattr(banden_voorraad.storage, 'pool_stats'):
+        request_metrics.register_gauges('db_pool', banden_voorraad.storage.pool_stats)
+    # Wijzigingen van andere workers via LISTEN/NOTIFY, ook alleen bij de postgres engine
+    if (hasattr(banden_voorraad.storage, 'subscribe_changes')
+            and os.getenv('DB_CHANGE_LISTENER', 'true').lower() in ('1', 'true', 'yes')):
+        banden_voorraad.listen_for_changes()
+        request_metrics.register_gauges('db_listen', banden_voorraad.storage.change_stats)
+    app.register_blueprint(bp)
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5001) 
\ No newline at end of file
+    banden_voorraad.setup_database()
+    create_app().run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Herhaalbare benchmark van de direct PostgreSQL backend tegen een lokale database
+
+Vult een aparte benchmark database met een instelbare catalogus en reserveringen,
+stuurt elke route en BandenVoorraad methode door de Flask test client en rapporteert
+p50/p95/p99 latency, queries per request en piekgeheugen. Resultaten komen als JSON
+in benchmark_results/ zodat runs te vergelijken zijn.
+
+Gebruik:
+    python benchmark.py --tires 20000 --reservations 5000 --iterations 50
+    python benchmark.py --no-seed --warm
+    python benchmark.py --compare benchmark_results/20250101-120000-abc1234.json
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+from flask import g
+
+import migrations
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_results')
+
+BRANDS = ['Michelin', 'Continental', 'Vredestein', 'Bridgestone', 'Goodyear',
+          'Dunlop', 'Pirelli', 'Hankook', 'Kumho Tyres', 'Hifly']
+TIRE_TYPES = ['zomer', 'winter', 'all_season']
+CUSTOMERS = ['Jan Jansen', 'Piet Pietersen', 'Klaas de Vries', 'Marie Bakker', 'Anna Visser',
+             'Henk Smit', 'Sanne de Boer', 'Kees Mulder', 'Fatima El Amrani', 'Lars Meijer']
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark routes en BandenVoorraad methodes")
+    parser.add_argument('--tires', type=int, default=10000, help="aantal banden in de catalogus")
+    parser.add_argument('--reservations', type=int, default=5000, help="aantal reserveringen")
+    parser.add_argument('--iterations', type=int, default=30, help="metingen per scenario")
+    parser.add_argument('--warmup', type=int, default=3, help="niet gemeten aanroepen per scenario")
+    parser.add_argument('--dbname', default=os.getenv('BENCH_DBNAME', 'bandenboer_bench'),
+                        help="benchmark database, wordt aangemaakt als hij niet bestaat")
+    parser.add_argument('--seed', type=int, default=42, help="random seed voor de testdata")
+    parser.add_argument('--no-seed', action='store_true', help="bestaande data in de benchmark database gebruiken")
+    parser.add_argument('--warm', action='store_true', help="catalog en fragment cache niet legen tussen metingen")
+    parser.add_argument('--only', help="alleen scenario's waarvan de naam deze tekst bevat")
+    parser.add_argument('--output', default=RESULTS_DIR, help="map voor de JSON resultaten")
+    parser.add_argument('--compare', help="vorig resultaat om mee te vergelijken (standaard het laatste)")
+    parser.add_argument('--force', action='store_true', help="ook tegen een niet-lokale host draaien")
+    return parser.parse_args(argv)
+
+
+def connection_params(dbname):
+    """Connection settings for the benchmark database, with local defaults; main() hands them to the app"""
+    return {
+        'user': os.getenv('user', 'postgres'),
+        'password': os.getenv('password', ''),
+        'host': os.getenv('host', 'localhost'),
+        'port': os.getenv('port', '5432'),
+        'dbname': dbname
+    }
+
+
+def ensure_database(dbname):
+    """Create the benchmark database if it does not exist yet"""
+    params = connection_params(os.getenv('dbname', 'postgres'))
+    conn = psycopg2.connect(**params)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s;", (dbname,))
+            if cursor.fetchone() is None:
+                cursor.execute(sql.SQL("CREATE DATABASE {};").format(sql.Identifier(dbname)))
+                print(f"✅ Database {dbname} aangemaakt")
+    finally:
+        conn.close()
+
+
+def random_size(rng):
+    """Realistic tire size, sometimes with load and speed index"""
+    size = f"{rng.choice(range(155, 320, 10))}/{rng.choice(range(35, 75, 5))}R{rng.randint(13, 21)}"
+    if rng.random() < 0.4:
+        size += f" {rng.randint(75, 110)}{rng.choice('HTVWY')}"
+    return size
+
+
+def seed(conn, tires, reservations, seed_value):
+    """Replace all tires and reservations with generated data"""
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+
+    tire_rows = []
+    for _ in range(tires):
+        condition = 'new' if rng.random() < 0.7 else 'used'
+        # Ongeveer 10% uitverkocht en 15% lage voorraad
+        roll = rng.random()
+        stock = 0 if roll < 0.1 else rng.randint(1, 4) if roll < 0.25 else rng.randint(5, 40)
+        price = round(rng.uniform(30, 250), 2) if rng.random() < 0.9 else None
+        created = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        tire_rows.append((rng.choice(BRANDS), random_size(rng), rng.choice(TIRE_TYPES),
+                          condition, stock, price, created, created))
+
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE reservations, tires RESTART IDENTITY CASCADE;")
+        execute_values(cursor, """
+        INSERT INTO tires (brand, size, tire_type, condition, stock, price, created_at, updated_at)
+        VALUES %s;
+        """, tire_rows, page_size=1000)
+
+        reservation_rows = []
+        for _ in range(reservations if tires else 0):
+            day = (now + timedelta(days=rng.randint(-300, 60))).date()
+            reservation_rows.append((rng.randint(1, tires), rng.choice(CUSTOMERS), day,
+                                     rng.choice(['', 'Voor VW Golf', 'Winterbanden nodig', 'Met montage'])))
+        execute_values(cursor, """
+        INSERT INTO reservations (tire_id, customer_name, reservation_date, notes)
+        VALUES %s;
+        """, reservation_rows, page_size=1000)
+        cursor.execute("ANALYZE tires; ANALYZE reservations;")
+    conn.commit()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def route(client, url):
+    """Scenario step for a route, returns the number of database queries"""
+    def run():
+        response = client.get(url)
+        # Export wordt gestreamd: pas na het lezen van de body is alles opgehaald
+        response.get_data()
+        if response.status_code != 200:
+            raise Exception(f"{url} gaf status {response.status_code}")
+        match = re.search(r'desc="(\d+) queries"', response.headers.get('Server-Timing', ''))
+        return int(match.group(1)) if match else None
+    return run
+
+
+def method(app, fn):
+    """Scenario step for a BandenVoorraad method, run inside a request so queries are counted"""
+    def run():
+        with app.test_request_context('/'):
+            app.preprocess_request()
+            result = fn()
+            if hasattr(result, '__next__'):
+                for _ in result:
+                    pass
+            return g.metrics_queries
+    return run
+
+
+def scenarios(app, banden_voorraad):
+    """All benchmark scenarios as (name, step) pairs"""
+    client = app.test_client()
+    page = {'limit': 51}
+    return [
+        ('route /', route(client, '/')),
+        ('route /inventory', route(client, '/inventory')),
+        ('route /inventory search', route(client, '/inventory?search=michelin')),
+        ('route /inventory fuzzy search', route(client, '/inventory?search=bridgstone')),
+        ('route /inventory size filter', route(client, '/inventory?width_min=205&width_max=225&rim_min=16')),
+        ('route /inventory low stock', route(client, '/inventory?stock_filter=low_stock')),
+        ('route /reservations', route(client, '/reservations')),
+        ('route /inventory/export', route(client, '/inventory/export')),
+        ('method get_homepage', method(app, lambda: banden_voorraad.get_homepage(**page))),
+        ('method get_all_tires', method(app, lambda: banden_voorraad.get_all_tires(**page))),
+        ('method search_tires', method(app, lambda: banden_voorraad.search_tires(search='continental', **page))),
+        ('method get_available_tires', method(app, banden_voorraad.get_available_tires)),
+        ('method get_reservations', method(app, lambda: banden_voorraad.get_reservations(**page))),
+        ('method get_inventory_stats', method(app, banden_voorraad.get_inventory_stats)),
+        ('method iter_search_tires', method(app, lambda: banden_voorraad.iter_search_tires())),
+    ]
+
+
+def measure(step, iterations, warmup, caches):
+    """Run one scenario, returns its latency/query/memory statistics"""
+    for _ in range(warmup):
+        step()
+
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        for cache in caches:
+            cache.clear()
+        started = time.perf_counter()
+        count = step()
+        timings.append((time.perf_counter() - started) * 1000)
+        if count is not None:
+            queries.append(count)
+
+    # Geheugen apart meten, tracemalloc vertraagt de timings
+    for cache in caches:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        step()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'peak_memory_kib': round(peak / 1024, 1)
+    }
+
+
+def git_commit():
+    """Short hash of the checked out commit, if available"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def latest_result(directory, exclude=None):
+    """Most recent stored result file, or None"""
+    files = sorted(path for path in glob.glob(os.path.join(directory, '*.json')) if path != exclude)
+    return files[-1] if files else None
+
+
+def print_results(results, previous=None):
+    """Table of all scenarios, with the p95 change against a previous run"""
+    previous = previous or {}
+    print(f"\n{'Scenario':<34} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'piek KiB':>10} {'p95 Δ':>8}")
+    print("-" * 92)
+    for name, stats in results.items():
+        delta = ''
+        before = previous.get(name)
+        if before and before.get('p95_ms'):
+            delta = f"{(stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100:+.0f}%"
+        queries = '' if stats['queries_per_request'] is None else f"{stats['queries_per_request']:g}"
+        print(f"{name:<34} {stats['p50_ms']:>8.2f}ms {stats['p95_ms']:>7.2f}ms {stats['p99_ms']:>7.2f}ms "
+              f"{queries:>8} {stats['peak_memory_kib']:>10.1f} {delta:>8}")
+
+
+def main(argv):
+    load_dotenv()
+    args = parse_args(argv)
+
+    params = connection_params(args.dbname)
+    host = params['host']
+    if 'supabase' in host and not args.force:
+        print(f"❌ Host {host} is geen lokale database, de benchmark overschrijft alle data")
+        print("🔧 Zet host/port/user/password naar een lokale PostgreSQL (of gebruik --force)")
+        return 1
+
+    ensure_database(args.dbname)
+    conn = psycopg2.connect(**params)
+    try:
+        done = migrations.migrate(conn)
+        if done:
+            print(f"✅ {len(done)} migraties uitgevoerd")
+        if not args.no_seed:
+            started = time.perf_counter()
+            seed(conn, args.tires, args.reservations, args.seed)
+            print(f"✅ {args.tires} banden en {args.reservations} reserveringen in "
+                  f"{time.perf_counter() - started:.1f}s")
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT (SELECT COUNT(*) FROM tires), (SELECT COUNT(*) FROM reservations), version();")
+            tire_count, reservation_count, server_version = cursor.fetchone()
+        conn.rollback()
+    finally:
+        conn.close()
+
+    # De app leest zijn database instellingen bij het importeren en valt anders terug op Supabase
+    os.environ.update(params)
+    os.environ['STORAGE_ENGINE'] = 'postgres'
+    import app_direct
+    app = app_direct.create_app()
+    banden_voorraad = app_direct.banden_voorraad
+
+    results = {}
+    caches = [] if args.warm else [banden_voorraad.cache, banden_voorraad.fragments]
+    for name, step in scenarios(app, banden_voorraad):
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(step, args.iterations, args.warmup, caches)
+        print(f"⏱️  {name}: p95 {results[name]['p95_ms']:.2f}ms")
+    banden_voorraad.storage.close_all()
+
+    run = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'config': {
+            'tires': tire_count,
+            'reservations': reservation_count,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'cache': 'warm' if args.warm else 'cold',
+            'page_size': app_direct.PAGE_SIZE
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'postgres': server_version
+        },
+        'results': results
+    }
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{run['commit'] or 'nogit'}.json")
+    compare = args.compare or latest_result(args.output)
+    previous = None
+    if compare:
+        with open(compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('config', {}).get('cache') != run['config']['cache']:
+            print(f"⚠️ {compare} is met een andere cache instelling gemeten")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+
+    print_results(results, previous['results'] if previous else None)
+    if previous:
+        print(f"\nVergeleken met {compare} (commit {previous.get('commit')})")
+    print(f"💾 Resultaat opgeslagen in {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
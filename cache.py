@@ -0,0 +1,128 @@
+"""
+In-process read-through cache voor de banden catalogus
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CatalogCache:
+    """Size-bounded LRU cache with a TTL and tag based invalidation"""
+
+    def __init__(self, max_entries=256, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    def get_or_load(self, key, loader, tags=()):
+        """Return the cached value for key, or call loader and cache its result"""
+        found, value = self.get(key)
+        if found:
+            return value
+        generation = self._generation
+        value = loader()
+        # Tags mogen van het resultaat afhangen (bijv. de tire ids in een lijst)
+        self.set(key, value, tags(value) if callable(tags) else tags, generation)
+        return value
+
+    def reload(self, key, loader, tags=()):
+        """Call loader even when key is cached and cache its result, returns (previous value or None, value)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+        value = loader()
+        self.set(key, value, tags(value) if callable(tags) else tags, generation)
+        # Ook een verlopen entry is de laatst bekende waarde
+        return (None if entry is None else entry[0]), value
+
+    def get(self, key):
+        """Look up a key, returns (found, value)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, value
+
+    def set(self, key, value, tags=(), generation=None):
+        """Store a value under key, tagged for later invalidation"""
+        if self.max_entries <= 0:
+            return
+        tags = frozenset(tags)
+        with self._lock:
+            # Niet opslaan als er tijdens het laden een schrijfactie was
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            # Minst recent gebruikte entries verwijderen
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying one of the given tags"""
+        with self._lock:
+            self._generation += 1
+            keys = set()
+            for tag in tags:
+                keys.update(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self._stats['invalidations'] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        """Get hit/miss/eviction counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        return stats
+
+    def _remove(self, key):
+        """Remove a key and its tag references, caller holds the lock"""
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
@@ -0,0 +1,86 @@
+"""
+Fan-out van rij wijzigingen (tires/reservations) naar live clients, bijv. Server-Sent Events
+"""
+
+import queue
+import threading
+
+# Gepubliceerd wanneer wijzigingen gemist kunnen zijn: clients moeten alles opnieuw laden
+RESYNC = {'op': 'RESYNC'}
+
+
+class Subscription:
+    """Changes published after subscribing, iterate to receive them (None after timeout seconds without any)"""
+
+    def __init__(self, feed, pending, timeout):
+        self._feed = feed
+        self._pending = pending
+        self.timeout = timeout
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self._pending.get(timeout=self.timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Stop receiving changes"""
+        self._feed._unsubscribe(self._pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ChangeFeed:
+    """Publish row changes ({'table', 'op', 'id', ...}) to any number of subscribers, one queue each"""
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._stats = {'published': 0, 'overflows': 0}
+
+    def listen(self, timeout=15):
+        """Subscribe from now on, returns a Subscription to iterate and close"""
+        pending = queue.Queue(self.max_pending)
+        with self._lock:
+            self._subscribers.add(pending)
+        return Subscription(self, pending, timeout)
+
+    def _unsubscribe(self, pending):
+        with self._lock:
+            self._subscribers.discard(pending)
+
+    def publish(self, change):
+        """Queue a change for every subscriber, never blocks on a slow one"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._stats['published'] += 1
+        for pending in subscribers:
+            try:
+                pending.put_nowait(change)
+            except queue.Full:
+                # Client leest niet bij: wachtrij leeg en één RESYNC in plaats van alles bufferen
+                with self._lock:
+                    self._stats['overflows'] += 1
+                try:
+                    while True:
+                        pending.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    pending.put_nowait(RESYNC)
+                except queue.Full:
+                    # Een andere thread was net sneller, die wachtrij loopt straks weer over
+                    pass
+
+    def stats(self):
+        """Counters for /metrics"""
+        with self._lock:
+            return dict(self._stats, subscribers=len(self._subscribers))
@@ -3,10 +3,18 @@
 Console versie van de Banden Voorraad Beheer applicatie
 """
 
+from werkzeug.local import LocalProxy
 from supabase import create_client, Client
+from postgrest.exceptions import APIError
+import argparse
+import json
 import os
 from datetime import datetime
 from dotenv import load_dotenv
+from tire_import import parse_import
+from snapshot import COLUMNS, InventorySnapshot
+from storage import create_storage
+from tire_batch import BatchRunner, parse_commands
 import sys
 
 # Load environment variables
@@ -16,11 +24,25 @@ load_dotenv()
 supabase_url = os.getenv('SUPABASE_URL')
 supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
-if not supabase_url or not supabase_key:
-    print("❌ Fout: SUPABASE_URL en SUPABASE_SERVICE_ROLE_KEY moeten ingesteld zijn in .env bestand")
-    sys.exit(1)
+_supabase = None
 
-supabase: Client = create_client(supabase_url, supabase_key)
+def get_supabase():
+    """Supabase client, created on first use"""
+    global _supabase
+    if _supabase is None:
+        if not supabase_url or not supabase_key:
+            raise Exception("SUPABASE_URL en SUPABASE_SERVICE_ROLE_KEY moeten ingesteld zijn in .env bestand")
+        _supabase = create_client(supabase_url, supabase_key)
+    return _supabase
+
+# Zelfde gebruik als een client, maar pas verbonden bij de eerste aanroep
+supabase: Client = LocalProxy(get_supabase)
+
+# Aantal rijen per INSERT/UPSERT bij een bulk import
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+
+# Aantal banden per pagina bij het kiezen van een band
+PICKER_PAGE_SIZE = int(os.getenv('PICKER_PAGE_SIZE', '10'))
 
 class ConsoleBandenVoorraad:
     def __init__(self):
@@ -48,6 +70,8 @@ class ConsoleBandenVoorraad:
         print("5. Reservering maken")
         print("6. Reserveringen bekijken")
         print("7. Reserveringen per klant")
+        print("8. Banden importeren (CSV/JSON)")
+        print("9. Lage voorraad bewaken")
         print("0. Afsluiten")
         print("-"*50)
     
@@ -56,35 +80,98 @@ class ConsoleBandenVoorraad:
         print("\n📋 VOORRAAD OVERZICHT")
         print("-"*50)
         
+        # Alle banden in één query (alleen de benodigde kolommen) als compacte snapshot
+        tires = supabase.table('tires').select(','.join(COLUMNS)).order('created_at', desc=True).execute()
+        snapshot = InventorySnapshot.from_rows(tires.data)
+        del tires
+        new_tires = list(snapshot.records(snapshot.filter(condition='new')))
+        used_tires = list(snapshot.records(snapshot.filter(condition='used')))
+        
         # Nieuwe banden
-        new_tires = supabase.table('tires').select('*').eq('condition', 'new').execute()
-        print(f"\n🆕 NIEUWE BANDEN ({len(new_tires.data)} items):")
-        if new_tires.data:
-            for tire in new_tires.data:
-                stock_status = "🔴" if tire['stock'] < 5 else "🟢"
+        print(f"\n🆕 NIEUWE BANDEN ({len(new_tires)} items):")
+        if new_tires:
+            for tire in new_tires:
+                stock_status = "🔴" if tire['stock'] < tire['low_stock_threshold'] else "🟢"
                 print(f"  {stock_status} {tire['brand']} {tire['size']} ({tire['tire_type']}) - Voorraad: {tire['stock']}")
         else:
             print("  Geen nieuwe banden in voorraad")
         
         # Tweedehands banden
-        used_tires = supabase.table('tires').select('*').eq('condition', 'used').execute()
-        print(f"\n♻️  TWEEDEHANDS BANDEN ({len(used_tires.data)} items):")
-        if used_tires.data:
-            for tire in used_tires.data:
-                stock_status = "🔴" if tire['stock'] < 5 else "🟢"
+        print(f"\n♻️  TWEEDEHANDS BANDEN ({len(used_tires)} items):")
+        if used_tires:
+            for tire in used_tires:
+                stock_status = "🔴" if tire['stock'] < tire['low_stock_threshold'] else "🟢"
                 print(f"  {stock_status} {tire['brand']} {tire['size']} ({tire['tire_type']}) - Voorraad: {tire['stock']}")
         else:
             print("  Geen tweedehands banden in voorraad")
         
         # Statistieken
-        total_tires = len(new_tires.data) + len(used_tires.data)
-        total_stock = sum(tire['stock'] for tire in new_tires.data + used_tires.data)
-        low_stock = len([t for t in new_tires.data + used_tires.data if t['stock'] < 5])
+        stats = snapshot.stats()
         
         print(f"\n📊 STATISTIEKEN:")
-        print(f"  Totaal banden: {total_tires}")
-        print(f"  Totaal voorraad: {total_stock}")
-        print(f"  Lage voorraad: {low_stock}")
+        print(f"  Totaal banden: {stats['total_tires']}")
+        print(f"  Totaal voorraad: {stats['total_stock']}")
+        print(f"  Lage voorraad: {stats['low_stock'] + stats['out_of_stock']}")
+    
+    def parse_tire_query(self, text):
+        """Split picker input into a brand and a size prefix, the size starts at the first word with a digit"""
+        brand, size = [], []
+        for word in text.split():
+            (size if size or word[0].isdigit() else brand).append(word)
+        return ' '.join(brand), ' '.join(size)
+    
+    def fetch_tire_page(self, brand, size, in_stock=False, after=None):
+        """One page of tires matching the prefixes, plus one extra row to know if there is a next page"""
+        # Filteren, sorteren en pagineren gebeurt in de database (pick_tires, index op merk/maat)
+        params = {'p_brand': brand, 'p_size': size, 'p_in_stock': in_stock, 'p_limit': PICKER_PAGE_SIZE + 1}
+        if after:
+            params.update({'p_after_brand': after['brand'], 'p_after_size': after['size'], 'p_after_id': after['id']})
+        return supabase.rpc('pick_tires', params).execute().data
+    
+    def pick_tire(self, in_stock=False):
+        """Kies een band via zoeken op merk/maat en bladeren, None bij annuleren"""
+        print("Zoek op merk en/of maat, bijv. 'mich', '205/55' of 'conti 225' (Enter voor alles)")
+        brand, size = self.parse_tire_query(input("Zoeken: "))
+        # Keyset cursor per bezochte pagina (de laatste band van de pagina ervoor), voor terugbladeren
+        cursors = [None]
+        rows = None
+        
+        while True:
+            # Alleen ophalen als zoekopdracht of pagina veranderd is
+            if rows is None:
+                rows = self.fetch_tire_page(brand, size, in_stock, cursors[-1])
+            tires, has_next = rows[:PICKER_PAGE_SIZE], len(rows) > PICKER_PAGE_SIZE
+            if tires:
+                print(f"\nBanden (pagina {len(cursors)}):")
+                for i, tire in enumerate(tires, 1):
+                    print(f"  {i}. {tire['brand']} {tire['size']} ({tire['condition']}) - Voorraad: {tire['stock']}")
+            else:
+                print("\n❌ Geen banden gevonden!")
+            
+            options = [f"nummer (1-{len(tires)})"] if tires else []
+            if has_next:
+                options.append("v = volgende")
+            if len(cursors) > 1:
+                options.append("t = terug")
+            options.extend(["z = opnieuw zoeken", "Enter = annuleren"])
+            choice = input(f"Keuze ({', '.join(options)}): ").strip().lower()
+            
+            if not choice:
+                return None
+            elif choice == 'v' and has_next:
+                cursors.append(tires[-1])
+                rows = None
+            elif choice == 't' and len(cursors) > 1:
+                cursors.pop()
+                rows = None
+            elif choice == 'z':
+                brand, size = self.parse_tire_query(input("Zoeken: "))
+                cursors = [None]
+                rows = None
+            elif choice.isdigit() and 1 <= int(choice) <= len(tires):
+                return tires[int(choice) - 1]
+            else:
+                print("❌ Ongeldige keuze!")
     
     def add_tire(self):
         """Voeg nieuwe banden toe"""
@@ -114,8 +201,8 @@ class ConsoleBandenVoorraad:
                 print("❌ Ongeldige keuze!")
                 return
             
-            print("Maat (formaat: xxx/xx/Rxx)")
-            print("Bijvoorbeeld: 205/55R16, 225/45R17, 195/65R15")
+            print("Maat (formaat: xxx/xx/Rxx, optioneel met load/speed index)")
+            print("Bijvoorbeeld: 205/55R16, 225/45R17, 195/65R15 91V")
             size = input("Voer maat in: ").strip()
             if not size:
                 print("❌ Maat is verplicht!")
@@ -123,7 +210,7 @@ class ConsoleBandenVoorraad:
             
             # Eenvoudige validatie voor formaat xxx/xx/Rxx
             import re
-            if not re.match(r'^\d{3}/\d{2}R\d{2}$', size):
+            if not re.match(r'^\d{3}/\d{2}R\d{2}( \d{2,3}[A-Z])?$', size):
                 print("❌ Ongeldig formaat! Gebruik formaat: xxx/xx/Rxx (bijv. 205/55R16)")
                 return
             
@@ -185,23 +272,12 @@ class ConsoleBandenVoorraad:
         print("\n✏️  BANDEN BEWERKEN")
         print("-"*50)
         
-        # Toon beschikbare banden
-        tires = supabase.table('tires').select('*').execute()
-        if not tires.data:
-            print("❌ Geen banden gevonden!")
-            return
-        
-        print("Beschikbare banden:")
-        for i, tire in enumerate(tires.data, 1):
-            print(f"  {i}. {tire['brand']} {tire['size']} ({tire['condition']}) - Voorraad: {tire['stock']}")
-        
         try:
-            choice = int(input("\nSelecteer band (nummer): ")) - 1
-            if choice < 0 or choice >= len(tires.data):
-                print("❌ Ongeldige keuze!")
+            tire = self.pick_tire()
+            if not tire:
+                print("❌ Geen band gekozen.")
                 return
             
-            tire = tires.data[choice]
             print(f"\nBewerken van: {tire['brand']} {tire['size']}")
             
             # Nieuwe waarden invoeren
@@ -229,7 +305,7 @@ class ConsoleBandenVoorraad:
             if size_input:
                 # Eenvoudige validatie voor formaat xxx/xx/Rxx
                 import re
-                if not re.match(r'^\d{3}/\d{2}R\d{2}$', size_input):
+                if not re.match(r'^\d{3}/\d{2}R\d{2}( \d{2,3}[A-Z])?$', size_input):
                     print("❌ Ongeldig formaat! Gebruik formaat: xxx/xx/Rxx (bijv. 205/55R16)")
                     return
                 size = size_input
@@ -280,23 +356,12 @@ class ConsoleBandenVoorraad:
         print("\n🗑️  BANDEN VERWIJDEREN")
         print("-"*50)
         
-        # Toon beschikbare banden
-        tires = supabase.table('tires').select('*').execute()
-        if not tires.data:
-            print("❌ Geen banden gevonden!")
-            return
-        
-        print("Beschikbare banden:")
-        for i, tire in enumerate(tires.data, 1):
-            print(f"  {i}. {tire['brand']} {tire['size']} ({tire['condition']}) - Voorraad: {tire['stock']}")
-        
         try:
-            choice = int(input("\nSelecteer band (nummer): ")) - 1
-            if choice < 0 or choice >= len(tires.data):
-                print("❌ Ongeldige keuze!")
+            tire = self.pick_tire()
+            if not tire:
+                print("❌ Geen band gekozen.")
                 return
             
-            tire = tires.data[choice]
             confirm = input(f"\nWeet je zeker dat je {tire['brand']} {tire['size']} wilt verwijderen? (j/N): ").strip().lower()
             
             if confirm == 'j':
@@ -313,23 +378,13 @@ class ConsoleBandenVoorraad:
         print("\n📅 NIEUWE RESERVERING")
         print("-"*50)
         
-        # Toon beschikbare banden
-        available_tires = supabase.table('tires').select('*').gte('stock', 1).execute()
-        if not available_tires.data:
-            print("❌ Geen beschikbare banden!")
-            return
-        
-        print("Beschikbare banden:")
-        for i, tire in enumerate(available_tires.data, 1):
-            print(f"  {i}. {tire['brand']} {tire['size']} ({tire['condition']}) - Voorraad: {tire['stock']}")
-        
         try:
-            choice = int(input("\nSelecteer band (nummer): ")) - 1
-            if choice < 0 or choice >= len(available_tires.data):
-                print("❌ Ongeldige keuze!")
+            # Alleen banden op voorraad
+            tire = self.pick_tire(in_stock=True)
+            if not tire:
+                print("❌ Geen band gekozen.")
                 return
             
-            tire = available_tires.data[choice]
             customer_name = input("Klantnaam: ").strip()
             if not customer_name:
                 print("❌ Klantnaam is verplicht!")
@@ -355,16 +410,21 @@ class ConsoleBandenVoorraad:
                 'notes': notes
             }
             
-            # Controleer voorraad en maak reservering
-            if tire['stock'] < 1:
-                print("❌ Niet genoeg voorraad!")
-                return
-            
-            # Maak reservering en verminder voorraad
-            supabase.table('reservations').insert(reservation_data).execute()
-            supabase.table('tires').update({'stock': tire['stock'] - 1}).eq('id', tire['id']).execute()
+            # Maak reservering en verminder voorraad in één atomaire aanroep
+            try:
+                result = supabase.rpc('reserve_tire', {
+                    'p_tire_id': reservation_data['tire_id'],
+                    'p_customer_name': reservation_data['customer_name'],
+                    'p_reservation_date': reservation_data['reservation_date'],
+                    'p_notes': reservation_data['notes']
+                }).execute()
+            except APIError as e:
+                if 'Tire not available' in str(e):
+                    print("❌ Niet genoeg voorraad!")
+                    return
+                raise
             
-            print("✅ Reservering succesvol gemaakt!")
+            print(f"✅ Reservering succesvol gemaakt! Resterende voorraad: {result.data[0]['remaining_stock']}")
             
         except Exception as e:
             print(f"❌ Fout bij reserveren: {e}")
@@ -411,13 +471,84 @@ class ConsoleBandenVoorraad:
             if reservation['notes']:
                 print(f"     📝 {reservation['notes']}")
     
+    def import_tires(self):
+        """Importeer banden uit een CSV of JSON bestand"""
+        print("\n📥 BANDEN IMPORTEREN")
+        print("-"*50)
+        print("Kolommen zoals de export: ID, Merk, Maat, Type, Conditie, Voorraad, Prijs")
+        print("Regels met een ID werken een bestaande band bij, zonder ID worden ze toegevoegd")
+        
+        path = input("Pad naar bestand: ").strip()
+        if not path:
+            print("❌ Pad is verplicht!")
+            return
+        
+        try:
+            with open(path, encoding='utf-8-sig') as f:
+                rows, errors = parse_import(f.read(), path)
+            
+            inserts = [tire for _, tire in rows if 'id' not in tire]
+            updates = [(number, tire) for number, tire in rows if 'id' in tire]
+            
+            # Alleen bestaande ids bijwerken, onbekende ids komen in het foutenrapport
+            existing = set()
+            ids = [tire['id'] for _, tire in updates]
+            for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+                result = supabase.table('tires').select('id').in_('id', ids[start:start + IMPORT_BATCH_SIZE]).execute()
+                existing.update(row['id'] for row in result.data)
+            errors.extend(
+                {'row': number, 'error': f"Band met ID {tire['id']} bestaat niet"}
+                for number, tire in updates if tire['id'] not in existing
+            )
+            known = [tire for _, tire in updates if tire['id'] in existing]
+            
+            for start in range(0, len(inserts), IMPORT_BATCH_SIZE):
+                supabase.table('tires').insert(inserts[start:start + IMPORT_BATCH_SIZE]).execute()
+            for start in range(0, len(known), IMPORT_BATCH_SIZE):
+                supabase.table('tires').upsert(known[start:start + IMPORT_BATCH_SIZE]).execute()
+            
+            print(f"✅ {len(inserts)} toegevoegd, {len(known)} bijgewerkt, {len(errors)} fouten")
+            for error in sorted(errors, key=lambda error: error['row']):
+                print(f"   ❌ Regel {error['row']}: {error['error']}")
+        except Exception as e:
+            print(f"❌ Fout bij importeren: {e}")
+    
+    def watch_low_stock(self):
+        """Volg lage voorraad live, tot Ctrl+C"""
+        print("\n🔔 LAGE VOORRAAD BEWAKEN (Ctrl+C om te stoppen)")
+        print("-"*50)
+        
+        # Met STORAGE_ENGINE=postgres komen wijzigingen via LISTEN/NOTIFY, anders via de kleine
+        # lage voorraad query (partiële index) in plaats van de hele tabel
+        storage = create_storage()
+        low_stock = storage.get_low_stock()
+        for tire in low_stock:
+            print(f"  🔴 {tire['brand']} {tire['size']} - Voorraad: {tire['stock']} (drempel {tire['low_stock_threshold']})")
+        if not low_stock:
+            print("  Alle banden zitten boven hun drempel")
+        
+        events = storage.listen_low_stock()
+        try:
+            for event in events:
+                if event is None:
+                    continue
+                time = datetime.now().strftime('%H:%M:%S')
+                if event['low']:
+                    print(f"  {time} 🔴 {event['brand']} {event['size']} - Voorraad: {event['stock']} (drempel {event['low_stock_threshold']})")
+                else:
+                    print(f"  {time} 🟢 {event['brand']} {event['size']} - niet meer onder de drempel")
+        except KeyboardInterrupt:
+            print("\n⏹️  Gestopt met bewaken")
+        finally:
+            events.close()
+    
     def run(self):
         """Start de console applicatie"""
         print("🚗 Welkom bij Banden Voorraad Beheer!")
         
         while True:
             self.show_menu()
-            choice = input("Keuze (0-7): ").strip()
+            choice = input("Keuze (0-9): ").strip()
             
             if choice == '0':
                 print("👋 Tot ziens!")
@@ -436,9 +567,42 @@ class ConsoleBandenVoorraad:
                 self.show_reservations()
             elif choice == '7':
                 self.show_customer_reservations()
+            elif choice == '8':
+                self.import_tires()
+            elif choice == '9':
+                self.watch_low_stock()
             else:
                 print("❌ Ongeldige keuze!")
 
+def run_batch(path):
+    """Run a command file ('-' for stdin) without menus, prints a JSON summary, returns the exit code"""
+    try:
+        if path == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(path, encoding='utf-8-sig') as f:
+                lines = f.read().splitlines()
+    except OSError as e:
+        print(f"❌ Kan opdrachten niet lezen: {e}", file=sys.stderr)
+        return 2
+    
+    # Zelfde engine als de web app (STORAGE_ENGINE), opdrachten gebundeld per soort
+    commands, errors = parse_commands(lines)
+    summary = BatchRunner(create_storage()).run(commands, errors)
+    print(json.dumps(summary, indent=2, ensure_ascii=False, default=str))
+    return 0 if summary['ok'] else 1
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Banden Voorraad Beheer in de terminal")
+    parser.add_argument('--batch', metavar='BESTAND',
+                        help="opdrachten uit een bestand uitvoeren ('-' voor stdin) en een JSON samenvatting tonen")
+    args = parser.parse_args()
+    if args.batch:
+        sys.exit(run_batch(args.batch))
+    
+    if not supabase_url or not supabase_key:
+        print("❌ Fout: SUPABASE_URL en SUPABASE_SERVICE_ROLE_KEY moeten ingesteld zijn in .env bestand")
+        sys.exit(1)
+    
     app = ConsoleBandenVoorraad()
     app.run() 
\ No newline at end of file
@@ -1,6 +1,10 @@
 -- Database setup voor Banden Voorraad Beheer
--- Voer dit script uit in je Supabase SQL Editor
+-- Voer dit script uit in je Supabase SQL Editor, of `python migrations.py` voor alleen het schema
+--
+-- Elke "-- migration: <versie> <naam>" sectie is één migratie stap (zie migrations.py).
+-- Toegepaste stappen niet meer wijzigen (de checksum wordt gecontroleerd): voeg een nieuwe stap toe.
 
+-- migration: 1 initial_schema
 -- Tires table (Banden tabel)
 CREATE TABLE IF NOT EXISTS tires (
     id SERIAL PRIMARY KEY,
@@ -41,11 +45,618 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
+DROP TRIGGER IF EXISTS update_tires_updated_at ON tires;
 CREATE TRIGGER update_tires_updated_at 
     BEFORE UPDATE ON tires 
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+-- migration: 2 keyset_indexes
+-- Indexes voor keyset paginering op (created_at, id) en (reservation_date, id)
+CREATE INDEX IF NOT EXISTS idx_tires_created_id ON tires(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tires_condition_created_id ON tires(condition, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_reservations_date_id ON reservations(reservation_date DESC, id DESC);
+
+-- migration: 3 size_columns
+-- Maat opgesplitst in breedte/hoogte/velg (+ load en speed index), bijv. '205/55R16 91V'
+-- Gegenereerde kolommen: bestaande rijen worden bij het toevoegen in één keer gevuld
+ALTER TABLE tires
+    ADD COLUMN IF NOT EXISTS width SMALLINT
+        GENERATED ALWAYS AS (substring(upper(size) from '^(\d{3})/')::SMALLINT) STORED,
+    ADD COLUMN IF NOT EXISTS aspect_ratio SMALLINT
+        GENERATED ALWAYS AS (substring(upper(size) from '^\d{3}/(\d{2})')::SMALLINT) STORED,
+    ADD COLUMN IF NOT EXISTS rim_diameter SMALLINT
+        GENERATED ALWAYS AS (substring(upper(size) from '^\d{3}/\d{2}\s*Z?R\s*(\d{2})')::SMALLINT) STORED,
+    ADD COLUMN IF NOT EXISTS load_index SMALLINT
+        GENERATED ALWAYS AS (substring(upper(size) from '^\d{3}/\d{2}\s*Z?R\s*\d{2}\s+(\d{2,3})')::SMALLINT) STORED,
+    ADD COLUMN IF NOT EXISTS speed_index CHAR(1)
+        GENERATED ALWAYS AS (substring(upper(size) from '^\d{3}/\d{2}\s*Z?R\s*\d{2}\s+\d{2,3}\s*([A-Z])')) STORED;
+CREATE INDEX IF NOT EXISTS idx_tires_size_dims ON tires(rim_diameter, width, aspect_ratio);
+CREATE INDEX IF NOT EXISTS idx_tires_width ON tires(width);
+
+-- migration: 4 trigram_search
+-- Trigram zoekindex: snel zoeken op deel van merk/maat/type en tolerant voor typefouten
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE tires ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS (lower(brand || ' ' || size || ' ' || tire_type)) STORED;
+CREATE INDEX IF NOT EXISTS idx_tires_search_trgm ON tires USING GIN (search_text gin_trgm_ops);
+
+-- migration: 5 reserve_tire
+-- Reservering in één transactie: voorraad verlagen en reservering aanmaken
+-- Aanroepen via supabase.rpc('reserve_tire', {...}) of SELECT * FROM reserve_tire(...)
+CREATE OR REPLACE FUNCTION reserve_tire(
+    p_tire_id INTEGER,
+    p_customer_name VARCHAR,
+    p_reservation_date DATE,
+    p_notes TEXT
+)
+RETURNS TABLE (
+    id INTEGER,
+    tire_id INTEGER,
+    customer_name VARCHAR,
+    reservation_date DATE,
+    notes TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    remaining_stock INTEGER
+) AS $$
+#variable_conflict use_column
+DECLARE
+    v_stock INTEGER;
+BEGIN
+    UPDATE tires SET stock = stock - 1
+    WHERE tires.id = p_tire_id AND stock > 0
+    RETURNING stock INTO v_stock;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Tire not available';
+    END IF;
+
+    RETURN QUERY
+    INSERT INTO reservations AS r (tire_id, customer_name, reservation_date, notes)
+    VALUES (p_tire_id, p_customer_name, p_reservation_date, p_notes)
+    RETURNING r.id, r.tire_id, r.customer_name, r.reservation_date, r.notes, r.created_at, v_stock;
+END;
+$$ language 'plpgsql';
+
+-- migration: 6 inventory_stats
+-- Voorraad statistieken in één aggregate query
+CREATE OR REPLACE FUNCTION inventory_stats()
+RETURNS TABLE (
+    total_tires INTEGER,
+    new_tires INTEGER,
+    used_tires INTEGER,
+    total_stock INTEGER,
+    low_stock INTEGER,
+    out_of_stock INTEGER
+) AS $$
+    SELECT
+        COUNT(*)::INTEGER,
+        COUNT(*) FILTER (WHERE condition = 'new')::INTEGER,
+        COUNT(*) FILTER (WHERE condition = 'used')::INTEGER,
+        COALESCE(SUM(stock), 0)::INTEGER,
+        COUNT(*) FILTER (WHERE stock > 0 AND stock < 5)::INTEGER,
+        COUNT(*) FILTER (WHERE stock = 0)::INTEGER
+    FROM tires;
+$$ language 'sql' STABLE;
+
+-- migration: 7 homepage_tires
+-- Homepage: één pagina banden plus de statistieken in één aanroep
+CREATE OR REPLACE FUNCTION homepage_tires(
+    p_limit INTEGER,
+    p_after TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_after_id INTEGER DEFAULT NULL,
+    p_before TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_id INTEGER DEFAULT NULL
+)
+RETURNS JSON AS $$
+DECLARE
+    v_tires JSON;
+BEGIN
+    IF p_before IS NULL THEN
+        SELECT json_agg(t ORDER BY t.created_at DESC, t.id DESC) INTO v_tires
+        FROM (
+            SELECT * FROM tires
+            WHERE p_after IS NULL OR (created_at, id) < (p_after, p_after_id)
+            ORDER BY created_at DESC, id DESC
+            LIMIT p_limit
+        ) t;
+    ELSE
+        SELECT json_agg(t ORDER BY t.created_at DESC, t.id DESC) INTO v_tires
+        FROM (
+            SELECT * FROM tires
+            WHERE (created_at, id) > (p_before, p_before_id)
+            ORDER BY created_at ASC, id ASC
+            LIMIT p_limit
+        ) t;
+    END IF;
+
+    RETURN json_build_object(
+        'stats', (SELECT row_to_json(s) FROM inventory_stats() s),
+        'tires', COALESCE(v_tires, '[]'::json)
+    );
+END;
+$$ language 'plpgsql' STABLE;
+
+-- migration: 8 search_tires
+-- Gerangschikt zoeken via de trigram index
+DROP FUNCTION IF EXISTS search_tires(TEXT);
+CREATE FUNCTION search_tires(p_search TEXT)
+RETURNS TABLE (
+    id INTEGER,
+    brand VARCHAR,
+    size VARCHAR,
+    tire_type VARCHAR,
+    condition VARCHAR,
+    stock INTEGER,
+    price DECIMAL(10,2),
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    width SMALLINT,
+    aspect_ratio SMALLINT,
+    rim_diameter SMALLINT,
+    load_index SMALLINT,
+    speed_index CHAR(1),
+    search_rank NUMERIC
+) AS $$
+    -- Substring treffers eerst, daarna op gelijkenis (typefouten zoals 'Bridgstone')
+    SELECT t.id, t.brand, t.size, t.tire_type, t.condition, t.stock, t.price,
+           t.created_at, t.updated_at,
+           t.width, t.aspect_ratio, t.rim_diameter, t.load_index, t.speed_index,
+           ROUND((
+               CASE WHEN t.search_text LIKE '%' || lower(p_search) || '%' THEN 1 ELSE 0 END
+               + word_similarity(lower(p_search), t.search_text)
+           )::NUMERIC, 4)
+    FROM tires t
+    WHERE t.search_text LIKE '%' || lower(p_search) || '%'
+       OR lower(p_search) <% t.search_text;
+$$ language 'sql' STABLE;
+
+-- migration: 9 adjust_stock
+-- Voorraadcorrecties na een telling: alle banden in één set-based UPDATE
+-- p_adjustments: [{"tire_id": 1, "delta": -2}, {"tire_id": 2, "stock": 10}]
+CREATE OR REPLACE FUNCTION adjust_stock(p_adjustments JSON)
+RETURNS TABLE (
+    id INTEGER,
+    stock INTEGER
+) AS $$
+#variable_conflict use_column
+DECLARE
+    v_missing INTEGER[];
+BEGIN
+    SELECT array_agg(a.tire_id) INTO v_missing
+    FROM json_to_recordset(p_adjustments) AS a(tire_id INTEGER, delta INTEGER, stock INTEGER)
+    WHERE NOT EXISTS (SELECT 1 FROM tires t WHERE t.id = a.tire_id);
+
+    IF v_missing IS NOT NULL THEN
+        RAISE EXCEPTION 'Tires not found: %', array_to_string(v_missing, ', ');
+    END IF;
+
+    -- Absolute stock wint van delta; negatieve voorraad faalt op de CHECK constraint
+    RETURN QUERY
+    UPDATE tires AS t
+    SET stock = COALESCE(a.stock, t.stock + a.delta)
+    FROM json_to_recordset(p_adjustments) AS a(tire_id INTEGER, delta INTEGER, stock INTEGER)
+    WHERE t.id = a.tire_id
+    RETURNING t.id, t.stock;
+END;
+$$ language 'plpgsql';
+
+-- migration: 10 catalog_version
+-- Versie van de catalogus voor ETags van de JSON API: aantallen en laatste wijzigingen
+-- Elke voorraadwijziging raakt tires.updated_at (trigger), reserveringen worden alleen toegevoegd
+CREATE INDEX IF NOT EXISTS idx_tires_updated_at ON tires(updated_at);
+CREATE INDEX IF NOT EXISTS idx_reservations_created_at ON reservations(created_at);
+
+CREATE OR REPLACE FUNCTION catalog_version()
+RETURNS TABLE (
+    tire_count INTEGER,
+    tires_updated_at TIMESTAMP WITH TIME ZONE,
+    reservation_count INTEGER,
+    reservations_created_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT
+        (SELECT COUNT(*)::INTEGER FROM tires),
+        (SELECT MAX(updated_at) FROM tires),
+        (SELECT COUNT(*)::INTEGER FROM reservations),
+        (SELECT MAX(created_at) FROM reservations);
+$$ language 'sql' STABLE;
+
+-- migration: 11 low_stock_watch
+-- Drempel voor lage voorraad per band; below_threshold maakt het filterbaar via de REST API
+ALTER TABLE tires
+    ADD COLUMN IF NOT EXISTS low_stock_threshold INTEGER NOT NULL DEFAULT 5
+        CHECK (low_stock_threshold >= 0);
+ALTER TABLE tires
+    ADD COLUMN IF NOT EXISTS below_threshold BOOLEAN
+        GENERATED ALWAYS AS (stock < low_stock_threshold) STORED;
+
+-- Partiële index: alleen banden onder hun drempel, blijft klein hoe groot de catalogus ook wordt
+CREATE INDEX IF NOT EXISTS idx_tires_low_stock ON tires(stock, id) WHERE below_threshold;
+
+CREATE OR REPLACE FUNCTION inventory_stats()
+RETURNS TABLE (
+    total_tires INTEGER,
+    new_tires INTEGER,
+    used_tires INTEGER,
+    total_stock INTEGER,
+    low_stock INTEGER,
+    out_of_stock INTEGER
+) AS $$
+    SELECT
+        COUNT(*)::INTEGER,
+        COUNT(*) FILTER (WHERE condition = 'new')::INTEGER,
+        COUNT(*) FILTER (WHERE condition = 'used')::INTEGER,
+        COALESCE(SUM(stock), 0)::INTEGER,
+        COUNT(*) FILTER (WHERE stock > 0 AND below_threshold)::INTEGER,
+        COUNT(*) FILTER (WHERE stock = 0)::INTEGER
+    FROM tires;
+$$ language 'sql' STABLE;
+
+-- search_tires geeft de nieuwe kolommen ook terug
+DROP FUNCTION IF EXISTS search_tires(TEXT);
+CREATE FUNCTION search_tires(p_search TEXT)
+RETURNS TABLE (
+    id INTEGER,
+    brand VARCHAR,
+    size VARCHAR,
+    tire_type VARCHAR,
+    condition VARCHAR,
+    stock INTEGER,
+    price DECIMAL(10,2),
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    width SMALLINT,
+    aspect_ratio SMALLINT,
+    rim_diameter SMALLINT,
+    load_index SMALLINT,
+    speed_index CHAR(1),
+    low_stock_threshold INTEGER,
+    below_threshold BOOLEAN,
+    search_rank NUMERIC
+) AS $$
+    SELECT t.id, t.brand, t.size, t.tire_type, t.condition, t.stock, t.price,
+           t.created_at, t.updated_at,
+           t.width, t.aspect_ratio, t.rim_diameter, t.load_index, t.speed_index,
+           t.low_stock_threshold, t.below_threshold,
+           ROUND((
+               CASE WHEN t.search_text LIKE '%' || lower(p_search) || '%' THEN 1 ELSE 0 END
+               + word_similarity(lower(p_search), t.search_text)
+           )::NUMERIC, 4)
+    FROM tires t
+    WHERE t.search_text LIKE '%' || lower(p_search) || '%'
+       OR lower(p_search) <% t.search_text;
+$$ language 'sql' STABLE;
+
+-- Banden die onder hun drempel komen, erop blijven of er weer boven komen: NOTIFY op kanaal
+-- 'low_stock' (LISTEN in storage_postgres.py). De notificatie gaat pas uit bij de COMMIT.
+CREATE OR REPLACE FUNCTION notify_low_stock()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_tire tires;
+    v_was_low BOOLEAN := FALSE;
+    v_is_low BOOLEAN := FALSE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_tire := OLD;
+    ELSE
+        v_tire := NEW;
+        v_is_low := NEW.stock < NEW.low_stock_threshold;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        v_was_low := OLD.stock < OLD.low_stock_threshold;
+    END IF;
+
+    -- Een UPDATE zonder echte wijziging van voorraad of drempel geeft geen event
+    IF (v_is_low OR v_was_low) AND (TG_OP <> 'UPDATE'
+            OR (OLD.stock, OLD.low_stock_threshold) IS DISTINCT FROM (NEW.stock, NEW.low_stock_threshold)) THEN
+        PERFORM pg_notify('low_stock', json_build_object(
+            'id', v_tire.id,
+            'brand', v_tire.brand,
+            'size', v_tire.size,
+            'condition', v_tire.condition,
+            'stock', v_tire.stock,
+            'low_stock_threshold', v_tire.low_stock_threshold,
+            'low', v_is_low
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_tires_low_stock ON tires;
+CREATE TRIGGER notify_tires_low_stock
+    AFTER INSERT OR UPDATE OF stock, low_stock_threshold OR DELETE ON tires
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_low_stock();
+
+-- migration: 12 catalog_changes
+-- Elke rij wijziging in tires en reservations als NOTIFY op kanaal 'catalog_changes', zodat
+-- elke worker zijn cache direct bijwerkt (ChangeListener in storage_postgres.py)
+CREATE OR REPLACE FUNCTION notify_catalog_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row RECORD;
+    v_payload JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_row := OLD;
+    ELSE
+        v_row := NEW;
+    END IF;
+    v_payload := jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', v_row.id);
+
+    IF TG_TABLE_NAME = 'tires' THEN
+        -- stock_only: alleen de voorraad is gewijzigd (reservering, telling), lijsten zonder
+        -- voorraadfilter blijven dan geldig
+        v_payload := v_payload || jsonb_build_object(
+            'stock', v_row.stock,
+            'stock_only', TG_OP = 'UPDATE'
+                AND to_jsonb(OLD) - 'stock' - 'below_threshold' - 'updated_at'
+                  = to_jsonb(NEW) - 'stock' - 'below_threshold' - 'updated_at'
+        );
+    ELSE
+        v_payload := v_payload || jsonb_build_object('tire_id', v_row.tire_id);
+    END IF;
+
+    PERFORM pg_notify('catalog_changes', v_payload::text);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_tires_change ON tires;
+CREATE TRIGGER notify_tires_change
+    AFTER INSERT OR UPDATE OR DELETE ON tires
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_catalog_change();
+
+DROP TRIGGER IF EXISTS notify_reservations_change ON reservations;
+CREATE TRIGGER notify_reservations_change
+    AFTER INSERT OR UPDATE OR DELETE ON reservations
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_catalog_change();
+
+-- migration: 13 tire_picker
+-- Banden kiezen in de console: prefix op merk en/of maat, per pagina in (merk, maat, id) volgorde.
+-- Met COLLATE "C" dient dezelfde index zowel de LIKE prefix als de sortering en de keyset
+CREATE INDEX IF NOT EXISTS idx_tires_picker
+    ON tires ((lower(brand) COLLATE "C"), (lower(size) COLLATE "C"), id);
+
+CREATE OR REPLACE FUNCTION pick_tires(
+    p_brand TEXT DEFAULT '',
+    p_size TEXT DEFAULT '',
+    p_in_stock BOOLEAN DEFAULT FALSE,
+    p_limit INTEGER DEFAULT 10,
+    p_after_brand TEXT DEFAULT NULL,
+    p_after_size TEXT DEFAULT NULL,
+    p_after_id INTEGER DEFAULT NULL
+)
+RETURNS TABLE (
+    id INTEGER,
+    brand VARCHAR,
+    size VARCHAR,
+    tire_type VARCHAR,
+    condition VARCHAR,
+    stock INTEGER,
+    price DECIMAL(10,2),
+    low_stock_threshold INTEGER
+) AS $$
+    SELECT t.id, t.brand, t.size, t.tire_type, t.condition, t.stock, t.price, t.low_stock_threshold
+    FROM tires t
+    WHERE lower(t.brand) COLLATE "C" LIKE lower(p_brand) || '%'
+      AND lower(t.size) COLLATE "C" LIKE lower(p_size) || '%'
+      AND (NOT p_in_stock OR t.stock > 0)
+      AND (p_after_id IS NULL
+           OR (lower(t.brand) COLLATE "C", lower(t.size) COLLATE "C", t.id)
+              > (lower(p_after_brand) COLLATE "C", lower(p_after_size) COLLATE "C", p_after_id))
+    ORDER BY lower(t.brand) COLLATE "C", lower(t.size) COLLATE "C", t.id
+    LIMIT p_limit;
+$$ language 'sql' STABLE;
+
+-- migration: 14 reserve_tires
+-- Veel reserveringen in één aanroep en één transactie (batch mode van de console), in volgorde.
+-- p_reservations: [{"tire_id": 1, "customer_name": "Jan", "reservation_date": "2026-10-17", "notes": ""}]
+-- Per reservering het nieuwe id en de resterende voorraad, of NULL als de band niet op voorraad was
+CREATE OR REPLACE FUNCTION reserve_tires(p_reservations JSON)
+RETURNS TABLE (
+    item INTEGER,
+    id INTEGER,
+    remaining_stock INTEGER
+) AS $$
+#variable_conflict use_column
+DECLARE
+    v_reservation RECORD;
+BEGIN
+    FOR v_reservation IN
+        SELECT a.tire_id, a.customer_name, a.reservation_date, a.notes, a.item::INTEGER AS item
+        FROM ROWS FROM (json_to_recordset(p_reservations)
+                 AS (tire_id INTEGER, customer_name VARCHAR, reservation_date DATE, notes TEXT))
+             WITH ORDINALITY AS a(tire_id, customer_name, reservation_date, notes, item)
+    LOOP
+        item := v_reservation.item;
+        id := NULL;
+        UPDATE tires SET stock = stock - 1
+        WHERE tires.id = v_reservation.tire_id AND stock > 0
+        RETURNING stock INTO remaining_stock;
+
+        IF FOUND THEN
+            INSERT INTO reservations AS r (tire_id, customer_name, reservation_date, notes)
+            VALUES (v_reservation.tire_id, v_reservation.customer_name,
+                    v_reservation.reservation_date, COALESCE(v_reservation.notes, ''))
+            RETURNING r.id INTO id;
+        END IF;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ language 'plpgsql';
+
+-- migration: 15 search_tires_page
+-- Eén pagina zoekresultaten voor de REST API: filters, limit en keyset (search_rank, id) in de
+-- database, want op een rpc() aanroep kan PostgREST daarna niet meer sorteren of pagineren.
+-- Altijd aflopend op (search_rank, id), ook bij terugbladeren met p_before_rank/p_before_id
+CREATE OR REPLACE FUNCTION search_tires_page(
+    p_search TEXT,
+    p_condition TEXT DEFAULT NULL,
+    p_tire_type TEXT DEFAULT NULL,
+    p_stock_filter TEXT DEFAULT NULL,
+    p_width_min INTEGER DEFAULT NULL,
+    p_width_max INTEGER DEFAULT NULL,
+    p_aspect_min INTEGER DEFAULT NULL,
+    p_aspect_max INTEGER DEFAULT NULL,
+    p_rim_min INTEGER DEFAULT NULL,
+    p_rim_max INTEGER DEFAULT NULL,
+    p_limit INTEGER DEFAULT NULL,
+    p_after_rank NUMERIC DEFAULT NULL,
+    p_after_id INTEGER DEFAULT NULL,
+    p_before_rank NUMERIC DEFAULT NULL,
+    p_before_id INTEGER DEFAULT NULL
+)
+RETURNS TABLE (
+    id INTEGER,
+    brand VARCHAR,
+    size VARCHAR,
+    tire_type VARCHAR,
+    condition VARCHAR,
+    stock INTEGER,
+    price DECIMAL(10,2),
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    width SMALLINT,
+    aspect_ratio SMALLINT,
+    rim_diameter SMALLINT,
+    load_index SMALLINT,
+    speed_index CHAR(1),
+    low_stock_threshold INTEGER,
+    below_threshold BOOLEAN,
+    search_rank NUMERIC
+) AS $$
+    SELECT * FROM (
+        SELECT s.* FROM search_tires(p_search) s
+        WHERE (p_condition IS NULL OR s.condition = p_condition)
+          AND (p_tire_type IS NULL OR s.tire_type = p_tire_type)
+          AND CASE p_stock_filter
+                  WHEN 'in_stock' THEN s.stock > 0
+                  WHEN 'low_stock' THEN s.stock > 0 AND s.below_threshold
+                  WHEN 'out_of_stock' THEN s.stock = 0
+                  ELSE TRUE
+              END
+          AND (p_width_min IS NULL OR s.width >= p_width_min)
+          AND (p_width_max IS NULL OR s.width <= p_width_max)
+          AND (p_aspect_min IS NULL OR s.aspect_ratio >= p_aspect_min)
+          AND (p_aspect_max IS NULL OR s.aspect_ratio <= p_aspect_max)
+          AND (p_rim_min IS NULL OR s.rim_diameter >= p_rim_min)
+          AND (p_rim_max IS NULL OR s.rim_diameter <= p_rim_max)
+          AND (p_after_id IS NULL OR (s.search_rank, s.id) < (p_after_rank, p_after_id))
+          AND (p_before_id IS NULL OR (s.search_rank, s.id) > (p_before_rank, p_before_id))
+        -- Bij terugbladeren oplopend de dichtstbijzijnde rijen nemen
+        ORDER BY CASE WHEN p_before_id IS NULL THEN s.search_rank END DESC,
+                 CASE WHEN p_before_id IS NULL THEN s.id END DESC,
+                 s.search_rank, s.id
+        LIMIT p_limit
+    ) page
+    ORDER BY page.search_rank DESC, page.id DESC;
+$$ language 'sql' STABLE;
+
+-- migration: 16 escape_like
+-- Zoektermen letterlijk nemen: % en _ in de invoer zijn anders LIKE wildcards ('_' past op elk teken).
+-- IMMUTABLE, zodat een constante zoekterm vooraf geëscaped wordt en de indexen bruikbaar blijven
+CREATE OR REPLACE FUNCTION escape_like(p_text TEXT)
+RETURNS TEXT AS $$
+    SELECT replace(replace(replace(p_text, '\', '\\'), '%', '\%'), '_', '\_');
+$$ language 'sql' IMMUTABLE STRICT;
+
+-- Substring treffers van search_tires (en daarmee search_tires_page) met de geëscapete zoekterm
+CREATE OR REPLACE FUNCTION search_tires(p_search TEXT)
+RETURNS TABLE (
+    id INTEGER,
+    brand VARCHAR,
+    size VARCHAR,
+    tire_type VARCHAR,
+    condition VARCHAR,
+    stock INTEGER,
+    price DECIMAL(10,2),
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    width SMALLINT,
+    aspect_ratio SMALLINT,
+    rim_diameter SMALLINT,
+    load_index SMALLINT,
+    speed_index CHAR(1),
+    low_stock_threshold INTEGER,
+    below_threshold BOOLEAN,
+    search_rank NUMERIC
+) AS $$
+    SELECT t.id, t.brand, t.size, t.tire_type, t.condition, t.stock, t.price,
+           t.created_at, t.updated_at,
+           t.width, t.aspect_ratio, t.rim_diameter, t.load_index, t.speed_index,
+           t.low_stock_threshold, t.below_threshold,
+           ROUND((
+               CASE WHEN t.search_text LIKE '%' || escape_like(lower(p_search)) || '%' THEN 1 ELSE 0 END
+               + word_similarity(lower(p_search), t.search_text)
+           )::NUMERIC, 4)
+    FROM tires t
+    WHERE t.search_text LIKE '%' || escape_like(lower(p_search)) || '%'
+       OR lower(p_search) <% t.search_text;
+$$ language 'sql' STABLE;
+
+-- Prefix van pick_tires idem, de picker index blijft een range scan
+CREATE OR REPLACE FUNCTION pick_tires(
+    p_brand TEXT DEFAULT '',
+    p_size TEXT DEFAULT '',
+    p_in_stock BOOLEAN DEFAULT FALSE,
+    p_limit INTEGER DEFAULT 10,
+    p_after_brand TEXT DEFAULT NULL,
+    p_after_size TEXT DEFAULT NULL,
+    p_after_id INTEGER DEFAULT NULL
+)
+RETURNS TABLE (
+    id INTEGER,
+    brand VARCHAR,
+    size VARCHAR,
+    tire_type VARCHAR,
+    condition VARCHAR,
+    stock INTEGER,
+    price DECIMAL(10,2),
+    low_stock_threshold INTEGER
+) AS $$
+    SELECT t.id, t.brand, t.size, t.tire_type, t.condition, t.stock, t.price, t.low_stock_threshold
+    FROM tires t
+    WHERE lower(t.brand) COLLATE "C" LIKE escape_like(lower(p_brand)) || '%'
+      AND lower(t.size) COLLATE "C" LIKE escape_like(lower(p_size)) || '%'
+      AND (NOT p_in_stock OR t.stock > 0)
+      AND (p_after_id IS NULL
+           OR (lower(t.brand) COLLATE "C", lower(t.size) COLLATE "C", t.id)
+              > (lower(p_after_brand) COLLATE "C", lower(p_after_size) COLLATE "C", p_after_id))
+    ORDER BY lower(t.brand) COLLATE "C", lower(t.size) COLLATE "C", t.id
+    LIMIT p_limit;
+$$ language 'sql' STABLE;
+
+-- migration: 17 update_tires
+-- Veel banden deels bijwerken in één aanroep en één transactie (edit in de batch mode van de console).
+-- p_updates: [{"id": 12, "price": 79.5, "low_stock_threshold": 3}]; alleen de genoemde kolommen
+-- veranderen, de rest (ook stock) blijft de actuele waarde uit de rij zelf. Geeft de gevonden ids terug
+CREATE OR REPLACE FUNCTION update_tires(p_updates JSONB)
+RETURNS TABLE (id INTEGER) AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    UPDATE tires AS t SET
+        brand = CASE WHEN u.value ? 'brand' THEN u.value->>'brand' ELSE t.brand END,
+        size = CASE WHEN u.value ? 'size' THEN u.value->>'size' ELSE t.size END,
+        tire_type = CASE WHEN u.value ? 'tire_type' THEN u.value->>'tire_type' ELSE t.tire_type END,
+        condition = CASE WHEN u.value ? 'condition' THEN u.value->>'condition' ELSE t.condition END,
+        stock = CASE WHEN u.value ? 'stock' THEN (u.value->>'stock')::INTEGER ELSE t.stock END,
+        price = CASE WHEN u.value ? 'price' THEN (u.value->>'price')::DECIMAL ELSE t.price END,
+        low_stock_threshold = CASE WHEN u.value ? 'low_stock_threshold'
+                                   THEN (u.value->>'low_stock_threshold')::INTEGER
+                                   ELSE t.low_stock_threshold END
+    FROM jsonb_array_elements(p_updates) AS u(value)
+    WHERE t.id = (u.value->>'id')::INTEGER
+    RETURNING t.id;
+END;
+$$ language 'plpgsql';
+
+-- end migrations
+
 -- Sample data voor testing (optioneel)
 INSERT INTO tires (brand, size, tire_type, condition, stock, price) VALUES
 ('Michelin', '205/55R16', 'zomer', 'new', 10, 89.99),
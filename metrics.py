@@ -0,0 +1,163 @@
+"""
+Per-request query timing en een Prometheus-achtig /metrics endpoint
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, before_render_template, g, has_request_context, request, template_rendered
+
+# Grenzen in seconden voor de latency histogrammen
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Grenzen voor het aantal queries per request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+
+class Histogram:
+    """Cumulative histogram per route label"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, route, value):
+        """Add one observation for a route, caller holds the registry lock"""
+        series = self._series.get(route)
+        if series is None:
+            series = self._series[route] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series['counts'][i] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def render(self):
+        """Prometheus text exposition lines"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for route, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series['counts']):
+                lines.append(f'{self.name}_bucket{{route="{route}",le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{route="{route}",le="+Inf"}} {series["count"]}')
+            lines.append(f'{self.name}_sum{{route="{route}"}} {series["sum"]:.6f}')
+            lines.append(f'{self.name}_count{{route="{route}"}} {series["count"]}')
+        return lines
+
+
+class RequestMetrics:
+    """Collects query count, DB time, render time and latency per route"""
+
+    def __init__(self, prefix='bandenboer'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._gauges = {}
+        self.request_duration = Histogram(
+            f'{prefix}_request_duration_seconds', 'Total request latency', DURATION_BUCKETS)
+        self.db_duration = Histogram(
+            f'{prefix}_db_duration_seconds', 'Time spent in database calls per request', DURATION_BUCKETS)
+        self.render_duration = Histogram(
+            f'{prefix}_render_duration_seconds', 'Time spent rendering templates per request', DURATION_BUCKETS)
+        self.db_queries = Histogram(
+            f'{prefix}_db_queries_per_request', 'Database calls per request', QUERY_COUNT_BUCKETS)
+
+    def init_app(self, app):
+        """Register the request hooks and the /metrics endpoint"""
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        before_render_template.connect(self._start_render, app)
+        template_rendered.connect(self._finish_render, app)
+        app.add_url_rule('/metrics', 'metrics', self.render)
+
+    def register_gauges(self, name, provider):
+        """Expose the numeric values of provider() as gauges, e.g. pool or cache stats"""
+        self._gauges[name] = provider
+
+    @contextmanager
+    def query_timer(self):
+        """Time one database call and add it to the current request"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            target = self._current_target()
+            if target is not None:
+                with self._lock:
+                    target.metrics_db_time += time.perf_counter() - started
+                    target.metrics_queries += 1
+
+    def wrap(self, fn):
+        """Wrap fn for a worker thread so its queries count toward the current request"""
+        target = self._current_target()
+
+        def run(*args, **kwargs):
+            self._local.target = target
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._local.target = None
+        return run
+
+    def _current_target(self):
+        """The request globals queries are booked on, if any"""
+        target = getattr(self._local, 'target', None)
+        if target is None and has_request_context() and 'metrics_started' in g:
+            target = g._get_current_object()
+        return target
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_db_time = 0.0
+        g.metrics_render_time = 0.0
+        g.metrics_queries = 0
+
+    def _start_render(self, sender, template, context, **extra):
+        g.metrics_render_started = time.perf_counter()
+
+    def _finish_render(self, sender, template, context, **extra):
+        started = g.pop('metrics_render_started', None)
+        if started is not None:
+            g.metrics_render_time += time.perf_counter() - started
+
+    def _finish_request(self, response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+
+        total = time.perf_counter() - started
+        route = request.endpoint or 'unknown'
+        with self._lock:
+            self.request_duration.observe(route, total)
+            self.db_duration.observe(route, g.metrics_db_time)
+            self.render_duration.observe(route, g.metrics_render_time)
+            self.db_queries.observe(route, g.metrics_queries)
+
+        # Zelfde cijfers per request zichtbaar in de browser devtools
+        response.headers['Server-Timing'] = (
+            f'db;dur={g.metrics_db_time * 1000:.1f};desc="{g.metrics_queries} queries", '
+            f'render;dur={g.metrics_render_time * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        return response
+
+    def render(self):
+        """Prometheus text format of all histograms and gauges"""
+        with self._lock:
+            lines = []
+            for histogram in (self.request_duration, self.db_duration,
+                              self.render_duration, self.db_queries):
+                lines.extend(histogram.render())
+
+        for name, provider in sorted(self._gauges.items()):
+            for key, value in sorted(provider().items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    metric = f'{self.prefix}_{name}_{key}'
+                    lines.append(f"# TYPE {metric} gauge")
+                    lines.append(f"{metric} {value}")
+
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+request_metrics = RequestMetrics()
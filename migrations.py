@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migraties voor de direct PostgreSQL backend
+
+De stappen komen uit database_setup.sql: elke "-- migration: <versie> <naam>" sectie
+is één stap. Toegepaste stappen staan met hun checksum in de schema_version tabel.
+
+Gebruik:
+    python migrations.py           # openstaande stappen uitvoeren
+    python migrations.py status    # huidige en nieuwste versie tonen
+"""
+
+import hashlib
+import os
+import re
+import sys
+
+import psycopg2
+import psycopg2.errors
+from dotenv import load_dotenv
+
+SETUP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database_setup.sql')
+MIGRATION_MARKER = re.compile(r'^-- migration: (\d+) (\w+)\s*$')
+END_MARKER = '-- end migrations'
+
+# Vaste sleutel voor pg_advisory_lock, zodat twee migrate runs elkaar niet kruisen
+MIGRATION_LOCK_ID = 748213
+
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+"""
+
+
+def checksum(sql):
+    """SHA-256 of a step, ignoring trailing whitespace"""
+    normalized = '\n'.join(line.rstrip() for line in sql.strip().splitlines())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def load_migrations(path=SETUP_FILE):
+    """Split database_setup.sql into steps, returns dicts ordered by version"""
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+
+    migrations = []
+    current = None
+    for line in lines:
+        if line.strip() == END_MARKER:
+            break
+        match = MIGRATION_MARKER.match(line)
+        if match:
+            current = {'version': int(match.group(1)), 'name': match.group(2), 'lines': []}
+            migrations.append(current)
+        elif current is not None:
+            current['lines'].append(line)
+
+    for expected, migration in enumerate(migrations, start=1):
+        if migration['version'] != expected:
+            raise Exception(f"Migratie {migration['name']} heeft versie {migration['version']}, "
+                            f"verwacht {expected}")
+        migration['sql'] = '\n'.join(migration.pop('lines')).strip() + '\n'
+        migration['checksum'] = checksum(migration['sql'])
+    return migrations
+
+
+def latest_version(migrations=None):
+    """Highest version defined in database_setup.sql"""
+    migrations = load_migrations() if migrations is None else migrations
+    return migrations[-1]['version'] if migrations else 0
+
+
+def current_version(conn):
+    """Highest applied version, 0 for a database without schema_version"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version;")
+            return cursor.fetchone()[0]
+    except psycopg2.errors.UndefinedTable:
+        return 0
+    finally:
+        conn.rollback()
+
+
+def applied_migrations(conn):
+    """Applied versions mapped to their checksum"""
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_VERSION_TABLE)
+        cursor.execute("SELECT version, checksum FROM schema_version ORDER BY version;")
+        applied = dict(cursor.fetchall())
+    conn.commit()
+    return applied
+
+
+def migrate(conn, migrations=None):
+    """Apply all pending steps, each in its own transaction, returns the applied steps"""
+    migrations = load_migrations() if migrations is None else migrations
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_ID,))
+    conn.commit()
+
+    try:
+        applied = applied_migrations(conn)
+        for migration in migrations:
+            known = applied.get(migration['version'])
+            if known is not None and known != migration['checksum']:
+                raise Exception(f"Migratie {migration['version']} ({migration['name']}) is gewijzigd "
+                                f"nadat hij is toegepast, voeg een nieuwe stap toe")
+
+        done = []
+        for migration in migrations:
+            if migration['version'] in applied:
+                continue
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(migration['sql'])
+                    cursor.execute(
+                        "INSERT INTO schema_version (version, name, checksum) VALUES (%s, %s, %s);",
+                        (migration['version'], migration['name'], migration['checksum'])
+                    )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise Exception(f"Migratie {migration['version']} ({migration['name']}) mislukt: {e}")
+            done.append(migration)
+        return done
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_ID,))
+        conn.commit()
+
+
+def connect():
+    """Open a connection with the same settings as app_direct.py"""
+    return psycopg2.connect(
+        user=os.getenv('user', 'postgres'),
+        password=os.getenv('password', 'Bandenboer123!'),
+        host=os.getenv('host', 'db.tfcgwmxiqgnlyjtpymzy.supabase.co'),
+        port=os.getenv('port', '5432'),
+        dbname=os.getenv('dbname', 'postgres')
+    )
+
+
+def main(argv):
+    load_dotenv()
+    command = argv[1] if len(argv) > 1 else 'migrate'
+    if command not in ('migrate', 'status'):
+        print(f"❌ Onbekend commando: {command} (gebruik migrate of status)")
+        return 1
+
+    migrations = load_migrations()
+    try:
+        conn = connect()
+    except Exception as e:
+        print(f"❌ Database connectie fout: {e}")
+        return 1
+
+    try:
+        if command == 'status':
+            version = current_version(conn)
+            print(f"📋 Schema versie {version}, nieuwste versie {latest_version(migrations)}")
+            for migration in migrations[version:]:
+                print(f"   ⏳ {migration['version']} {migration['name']}")
+            return 0
+
+        done = migrate(conn, migrations)
+        for migration in done:
+            print(f"✅ {migration['version']} {migration['name']}")
+        print(f"✅ Schema is up to date (versie {latest_version(migrations)})")
+        return 0
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,164 @@
+"""
+Compacte voorraad snapshot: kolommen in array's in plaats van een lijst met dicts.
+
+Een dict per band kost al snel een halve kilobyte; hier is een band een paar bytes per
+kolom plus twee (geïnterneerde) strings. Statistieken en filters lopen met map/compress
+over de kolommen, zodat de lus in C draait en niet per rij in Python.
+"""
+import sys
+from array import array
+from itertools import compress, repeat
+from operator import and_, eq, ge, gt, le, lt
+
+from storage import LOW_STOCK_THRESHOLD, SIZE_FILTERS
+
+# Codes voor de kolommen condition en tire_type (positie in de tuple)
+CONDITIONS = ('new', 'used')
+TIRE_TYPES = ('zomer', 'winter', 'all_season')
+CONDITION_CODES = {name: code for code, name in enumerate(CONDITIONS)}
+TIRE_TYPE_CODES = {name: code for code, name in enumerate(TIRE_TYPES)}
+
+# Kolommen die een snapshot nodig heeft, voor een smallere SELECT
+COLUMNS = ('id', 'brand', 'size', 'tire_type', 'condition', 'stock', 'price',
+           'low_stock_threshold', 'width', 'aspect_ratio', 'rim_diameter')
+
+OPERATORS = {'>=': ge, '<=': le}
+
+
+class TireRecord:
+    """One tire from a snapshot, without the per-row dict"""
+    __slots__ = COLUMNS
+
+    def __init__(self, *values):
+        for name, value in zip(COLUMNS, values):
+            setattr(self, name, value)
+
+    def __getitem__(self, name):
+        # Zodat bestaande code met tire['stock'] blijft werken
+        return getattr(self, name)
+
+    def __repr__(self):
+        return f"TireRecord(id={self.id}, brand={self.brand!r}, size={self.size!r}, stock={self.stock})"
+
+
+class InventorySnapshot:
+    """All tires as typed columns, with vectorized stats and filters"""
+    __slots__ = COLUMNS + ('_positions',)
+
+    def __init__(self):
+        self.id = array('q')
+        self.brand = []
+        self.size = []
+        self.tire_type = array('b')
+        self.condition = array('b')
+        self.stock = array('l')
+        # NaN voor een onbekende prijs, 0 voor een maat die niet uit size te halen was
+        self.price = array('d')
+        # Onder deze voorraad telt een band als lage voorraad
+        self.low_stock_threshold = array('l')
+        self.width = array('h')
+        self.aspect_ratio = array('h')
+        self.rim_diameter = array('h')
+        # id -> positie, pas opgebouwd bij de eerste set_stock
+        self._positions = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a snapshot from an iterable of tire dicts (or records), one row at a time"""
+        snapshot = cls()
+        for row in rows:
+            snapshot.append(row)
+        return snapshot
+
+    def append(self, row):
+        """Add one tire"""
+        if self._positions is not None:
+            self._positions[row['id']] = len(self.id)
+        self.id.append(row['id'])
+        # Merken en maten komen veel vaker voor dan één keer, intern() deelt de string
+        self.brand.append(sys.intern(row['brand']))
+        self.size.append(sys.intern(row['size']))
+        self.tire_type.append(TIRE_TYPE_CODES[row['tire_type']])
+        self.condition.append(CONDITION_CODES[row['condition']])
+        self.stock.append(row['stock'])
+        self.price.append(float('nan') if row.get('price') is None else float(row['price']))
+        self.low_stock_threshold.append(row.get('low_stock_threshold', LOW_STOCK_THRESHOLD))
+        self.width.append(row.get('width') or 0)
+        self.aspect_ratio.append(row.get('aspect_ratio') or 0)
+        self.rim_diameter.append(row.get('rim_diameter') or 0)
+
+    def set_stock(self, tire_id, stock):
+        """Update the stock of one tire in place, returns False for an id not in the snapshot"""
+        if self._positions is None:
+            self._positions = {tire_id: position for position, tire_id in enumerate(self.id)}
+        position = self._positions.get(tire_id)
+        if position is None:
+            return False
+        self.stock[position] = stock
+        return True
+
+    def __len__(self):
+        return len(self.id)
+
+    def __getitem__(self, position):
+        price = self.price[position]
+        return TireRecord(
+            self.id[position], self.brand[position], self.size[position],
+            TIRE_TYPES[self.tire_type[position]], CONDITIONS[self.condition[position]],
+            self.stock[position], None if price != price else price,
+            self.low_stock_threshold[position],
+            self.width[position] or None, self.aspect_ratio[position] or None,
+            self.rim_diameter[position] or None
+        )
+
+    def records(self, positions=None):
+        """Yield TireRecords, for all tires or the given positions"""
+        for position in range(len(self)) if positions is None else positions:
+            yield self[position]
+
+    def stats(self, positions=None):
+        """Same numbers as get_inventory_stats(), for all tires or the given positions"""
+        if positions is None:
+            conditions, stock, threshold = self.condition, self.stock, self.low_stock_threshold
+        else:
+            conditions = array('b', map(self.condition.__getitem__, positions))
+            stock = array('l', map(self.stock.__getitem__, positions))
+            threshold = array('l', map(self.low_stock_threshold.__getitem__, positions))
+        in_stock = sum(map(lt, repeat(0), stock))
+        return {
+            'total_tires': len(conditions),
+            'new_tires': conditions.count(CONDITION_CODES['new']),
+            'used_tires': conditions.count(CONDITION_CODES['used']),
+            'total_stock': sum(stock),
+            'low_stock': sum(map(and_, map(lt, repeat(0), stock), map(lt, stock, threshold))),
+            'out_of_stock': len(stock) - in_stock
+        }
+
+    def filter(self, condition=None, tire_type=None, stock_filter=None, size_filter=None):
+        """Positions of the tires matching the /inventory filters (everything except free text)"""
+        # Elk filter is een iterator met booleans, and_ combineert ze zonder tussenlijsten.
+        # Een onbekende conditie of type (-1) matcht niets, net als in SQL
+        masks = []
+        if condition:
+            masks.append(map(eq, self.condition, repeat(CONDITION_CODES.get(condition, -1))))
+        if tire_type:
+            masks.append(map(eq, self.tire_type, repeat(TIRE_TYPE_CODES.get(tire_type, -1))))
+        if stock_filter == 'in_stock':
+            masks.append(map(gt, self.stock, repeat(0)))
+        elif stock_filter == 'low_stock':
+            masks.append(map(and_, map(gt, self.stock, repeat(0)), map(lt, self.stock, self.low_stock_threshold)))
+        elif stock_filter == 'out_of_stock':
+            masks.append(map(eq, self.stock, repeat(0)))
+        for name, value in (size_filter or {}).items():
+            column, operator = SIZE_FILTERS[name]
+            values = getattr(self, column)
+            # Een onbekende maat (0) valt net als NULL in SQL buiten elk maatfilter
+            masks.append(map(and_, map(bool, values), map(OPERATORS[operator], values, repeat(value))))
+
+        positions = range(len(self))
+        if not masks:
+            return list(positions)
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = map(and_, mask, other)
+        return list(compress(positions, mask))
@@ -0,0 +1,249 @@
+"""
+Storage interface onder BandenVoorraad en de keuze van de engine
+
+Engines: 'supabase' (REST API), 'postgres' (directe psycopg2 verbinding) en
+'sqlite' (lokaal bestand). Kies met STORAGE_ENGINE in .env.
+"""
+
+import os
+import re
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Maat filters uit de zoekbalk: argument -> (kolom, vergelijking)
+SIZE_FILTERS = {
+    'width_min': ('width', '>='),
+    'width_max': ('width', '<='),
+    'aspect_min': ('aspect_ratio', '>='),
+    'aspect_max': ('aspect_ratio', '<='),
+    'rim_min': ('rim_diameter', '>='),
+    'rim_max': ('rim_diameter', '<=')
+}
+
+# Aantal rijen per INSERT/UPDATE bij een bulk import
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+
+ENGINES = ('supabase', 'postgres', 'sqlite')
+
+# Standaard drempel voor lage voorraad, gelijk aan de DEFAULT van tires.low_stock_threshold
+LOW_STOCK_THRESHOLD = 5
+
+# Velden van een lage voorraad event, plus 'low' (staat de band nu onder zijn drempel)
+LOW_STOCK_FIELDS = ('id', 'brand', 'size', 'condition', 'stock', 'low_stock_threshold')
+
+# Engines zonder LISTEN/NOTIFY vergelijken de lage voorraad lijst met dit interval (seconden)
+LOW_STOCK_POLL_INTERVAL = float(os.getenv('LOW_STOCK_POLL_INTERVAL', '5'))
+
+
+def sort_column(search=None):
+    """Column search results are ordered and paged by"""
+    return 'search_rank' if search else 'created_at'
+
+
+def cursor_value(value):
+    """Keyset cursor text for a column value, timestamps always with microseconds"""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='microseconds')
+    return str(value)
+
+
+def low_stock_event(tire, low):
+    """Event payload for a tire that is, was or is no longer below its threshold"""
+    event = {field: tire[field] for field in LOW_STOCK_FIELDS}
+    event['low'] = low
+    return event
+
+
+def low_stock_change(event):
+    """A low-stock event in the shape of a row change ({'table', 'op', 'id', ...}), for the change feed"""
+    return {'table': 'tires', 'op': 'LOW_STOCK', **event}
+
+
+# Tijdstempel met 0-9 decimalen en een offset als Z, +HH, +HHMM of +HH:MM (PostgREST geeft 1-6 decimalen)
+TIMESTAMP_PARTS = re.compile(r'^(.*\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d(?::?\d\d)?)?$')
+
+
+def parse_timestamp(text):
+    """datetime from ISO text, also on Python < 3.11 whose fromisoformat only takes 0, 3 or 6 decimals"""
+    match = TIMESTAMP_PARTS.match(text)
+    if not match:
+        return datetime.fromisoformat(text)
+    base, fraction, offset = match.groups()
+    if fraction:
+        base += '.' + fraction[:6].ljust(6, '0')
+    if offset == 'Z':
+        offset = '+00:00'
+    elif offset:
+        digits = offset[1:].replace(':', '')
+        offset = f"{offset[0]}{digits[:2]}:{digits[2:4] or '00'}"
+    return datetime.fromisoformat(base + (offset or ''))
+
+
+def parse_timestamps(row):
+    """Turn created_at/updated_at text (JSON, SQLite) into datetime, also in a nested 'tires' dict"""
+    for column in ('created_at', 'updated_at'):
+        if isinstance(row.get(column), str):
+            row[column] = parse_timestamp(row[column])
+    if isinstance(row.get('tires'), dict):
+        parse_timestamps(row['tires'])
+    return row
+
+
+class Storage:
+    """Data access used by BandenVoorraad; every engine implements these methods
+
+    Reads return plain dicts and lists, with created_at/updated_at as datetime.
+    Lists are ordered newest first and paged by (column, id) keysets, where after
+    and before are (value, id) tuples taken from the first or last row of a page.
+    """
+
+    name = None
+
+    def setup(self):
+        """Check the connection and schema at startup, prints the result"""
+        raise NotImplementedError
+
+    def get_all_tires(self, condition='all', limit=None, after=None, before=None):
+        """Tires, optionally filtered by condition"""
+        raise NotImplementedError
+
+    def get_tire_by_id(self, tire_id):
+        """One tire, or None"""
+        raise NotImplementedError
+
+    def get_available_tires(self):
+        """Tires with stock > 0"""
+        raise NotImplementedError
+
+    def add_tire(self, data):
+        """Insert a tire, returns its id"""
+        raise NotImplementedError
+
+    def update_tire(self, tire_id, data):
+        """Overwrite all editable columns of a tire"""
+        raise NotImplementedError
+
+    def delete_tire(self, tire_id):
+        """Delete a tire and its reservations"""
+        raise NotImplementedError
+
+    def import_tires(self, rows):
+        """Insert (row number, tire) pairs without an id, update those with one
+
+        Returns {'inserted', 'updated', 'errors', 'ids'} where errors lists unknown ids
+        and ids are the new ids of the inserted rows, in order.
+        """
+        raise NotImplementedError
+
+    def reserve_tire(self, data):
+        """Atomically take one tire from stock and add the reservation
+
+        Returns the reservation with remaining_stock, raises Exception('Tire not available').
+        """
+        raise NotImplementedError
+
+    def adjust_stock(self, adjustments):
+        """Apply [{'tire_id', 'delta'|'stock'}] atomically, returns [{'id', 'stock'}]"""
+        raise NotImplementedError
+
+    def get_tires_by_ids(self, ids):
+        """The tires with these ids in as few round trips as possible, unknown ids are left out"""
+        raise NotImplementedError
+
+    def update_tires(self, updates):
+        """Change only the named columns of many tires ([{'id', column: value, ...}]) in one transaction
+
+        Columns that are not named, stock included, keep the value the row has at that moment.
+        Returns the ids that existed.
+        """
+        raise NotImplementedError
+
+    def delete_tires(self, ids):
+        """Delete many tires (and their reservations) at once, returns the ids that existed"""
+        raise NotImplementedError
+
+    def reserve_tires(self, reservations):
+        """Reserve many tires in one transaction, in order
+
+        Returns one {'id', 'remaining_stock'} per reservation, both None if the tire was not available.
+        """
+        raise NotImplementedError
+
+    def get_reservations(self, customer_name=None, limit=None, after=None, before=None):
+        """Reservations with the tire as nested 'tires' dict"""
+        raise NotImplementedError
+
+    def search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                     size_filter=None, limit=None, after=None, before=None):
+        """Filtered tires, ranked by search_rank when searching"""
+        raise NotImplementedError
+
+    def iter_search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                          size_filter=None, page_size=500):
+        """Yield all filtered tires without loading them at once"""
+        raise NotImplementedError
+
+    def get_inventory_stats(self):
+        """Counts per condition, total stock and low/out of stock counts"""
+        raise NotImplementedError
+
+    def get_homepage(self, limit=None, after=None, before=None):
+        """{'stats': ..., 'tires': [...]} for the homepage in one call"""
+        raise NotImplementedError
+
+    def get_catalog_version(self):
+        """Row counts and latest change of tires and reservations, changes on every write"""
+        raise NotImplementedError
+
+    def get_low_stock(self, limit=None):
+        """Tires below their low_stock_threshold, lowest stock first"""
+        raise NotImplementedError
+
+    def listen_low_stock(self, timeout=15):
+        """Yield an event (see low_stock_event) whenever a tire enters, changes below or leaves
+        its threshold, and None after timeout seconds without events
+
+        Default: compare get_low_stock() every LOW_STOCK_POLL_INTERVAL seconds. That query
+        only reads the partial index, engines with push notifications override this.
+        """
+        previous = {tire['id']: tire for tire in self.get_low_stock()}
+        quiet_since = time.monotonic()
+        while True:
+            time.sleep(min(LOW_STOCK_POLL_INTERVAL, timeout))
+            current = {tire['id']: tire for tire in self.get_low_stock()}
+            events = [
+                low_stock_event(tire, True) for tire_id, tire in current.items()
+                if tire_id not in previous
+                or (tire['stock'], tire['low_stock_threshold'])
+                != (previous[tire_id]['stock'], previous[tire_id]['low_stock_threshold'])
+            ]
+            # Weer boven de drempel (of verwijderd): de huidige voorraad opzoeken als die er is
+            for tire_id in previous.keys() - current.keys():
+                events.append(low_stock_event(self.get_tire_by_id(tire_id) or previous[tire_id], False))
+            previous = current
+
+            if events:
+                yield from events
+                quiet_since = time.monotonic()
+            elif time.monotonic() - quiet_since >= timeout:
+                yield None
+                quiet_since = time.monotonic()
+
+
+def create_storage(engine=None):
+    """Storage for the configured engine, imported lazily so unused drivers are optional"""
+    engine = (engine or os.getenv('STORAGE_ENGINE', 'supabase')).lower()
+    if engine == 'supabase':
+        from storage_supabase import SupabaseStorage
+        return SupabaseStorage()
+    if engine == 'postgres':
+        from storage_postgres import PostgresStorage
+        return PostgresStorage()
+    if engine == 'sqlite':
+        from storage_sqlite import SQLiteStorage
+        return SQLiteStorage()
+    raise Exception(f"Onbekende STORAGE_ENGINE: {engine} (kies uit {', '.join(ENGINES)})")
@@ -0,0 +1,640 @@
+"""
+PostgreSQL storage engine: directe psycopg2 verbinding met een connection pool
+"""
+
+import json
+import os
+import select
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.errors
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+
+from metrics import request_metrics
+from migrations import current_version, latest_version
+from storage import (Storage, SIZE_FILTERS, IMPORT_BATCH_SIZE, LOW_STOCK_THRESHOLD, sort_column,
+                     parse_timestamps, low_stock_change)
+
+
+# Supabase transaction pooler: geen vaste sessie per client, LISTEN ontvangt daar nooit een NOTIFY
+TRANSACTION_POOLER_PORT = '6543'
+
+
+def warn_transaction_pooler(connection_params):
+    """Warn when LISTEN would go through the transaction pooler instead of a direct connection"""
+    if str(connection_params.get('port')) == TRANSACTION_POOLER_PORT:
+        print(f"⚠️ Poort {TRANSACTION_POOLER_PORT} is de Supabase transaction pooler: LISTEN/NOTIFY werkt daar niet")
+        print("🔧 Gebruik voor live updates en cache invalidatie de directe poort 5432 (zie env_direct.txt)")
+
+
+class TimedConnectionPool(ThreadedConnectionPool):
+    """Thread-safe pool that reports every newly opened connection"""
+
+    def __init__(self, minconn, maxconn, on_connect, **kwargs):
+        self._on_connect = on_connect
+        super().__init__(minconn, maxconn, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        self._on_connect(conn)
+        return conn
+
+
+class DatabaseConnection:
+    def __init__(self):
+        self.connection_params = {
+            'user': os.getenv('user', 'postgres'),
+            'password': os.getenv('password', 'Bandenboer123!'),
+            'host': os.getenv('host', 'db.tfcgwmxiqgnlyjtpymzy.supabase.co'),
+            'port': os.getenv('port', '5432'),
+            'dbname': os.getenv('dbname', 'postgres')
+        }
+
+        # Pool instellingen
+        self.min_connections = int(os.getenv('DB_POOL_MIN', '1'))
+        self.max_connections = int(os.getenv('DB_POOL_MAX', '10'))
+        self.checkout_timeout = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+        self.ping_after = float(os.getenv('DB_POOL_PING_AFTER', '30'))
+
+        self._reset_pool()
+        os.register_at_fork(after_in_child=self._reset_pool)
+
+    def _reset_pool(self):
+        """Start without a pool and with fresh statistics, also in a forked worker"""
+        # Connecties van de parent niet sluiten of hergebruiken, die zijn nog van de parent
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._last_used = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'in_use': 0,
+            'waiting': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'checkout_time_total': 0.0,
+            'checkout_time_max': 0.0
+        }
+
+    def _get_pool(self):
+        """Create the connection pool on first use"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = TimedConnectionPool(
+                        self.min_connections, self.max_connections, self._opened, **self.connection_params
+                    )
+        return self._pool
+
+    def _opened(self, conn):
+        """A new connection counts as just used, no ping needed on its first checkout"""
+        self._last_used[id(conn)] = time.monotonic()
+
+    def _is_alive(self, conn):
+        """Check if a pooled connection can still be used"""
+        if conn.closed:
+            return False
+        # Alleen pingen als de connectie een tijd niet gebruikt is
+        idle = time.monotonic() - self._last_used.get(id(conn), 0)
+        if idle < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def get_connection(self):
+        """Get a database connection from the pool"""
+        started = time.monotonic()
+        with self._stats_lock:
+            self._stats['waiting'] += 1
+        acquired = self._slots.acquire(timeout=self.checkout_timeout)
+        with self._stats_lock:
+            self._stats['waiting'] -= 1
+            if not acquired:
+                self._stats['timeouts'] += 1
+        if not acquired:
+            raise PoolError(f"Geen vrije database connectie binnen {self.checkout_timeout}s")
+
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            while not self._is_alive(conn):
+                self._last_used.pop(id(conn), None)
+                pool.putconn(conn, close=True)
+                with self._stats_lock:
+                    self._stats['discarded'] += 1
+                conn = pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        elapsed = time.monotonic() - started
+        with self._stats_lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['checkout_time_total'] += elapsed
+            self._stats['checkout_time_max'] = max(self._stats['checkout_time_max'], elapsed)
+        return conn
+
+    def release_connection(self, conn):
+        """Return a connection to the pool"""
+        if conn.closed:
+            self._last_used.pop(id(conn), None)
+        else:
+            self._last_used[id(conn)] = time.monotonic()
+        try:
+            self._get_pool().putconn(conn, close=bool(conn.closed))
+        finally:
+            with self._stats_lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for the duration of a with-block"""
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            self.release_connection(conn)
+
+    def pool_stats(self):
+        """Get connection pool statistics"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        checkouts = stats['checkouts']
+        stats['checkout_time_avg'] = stats['checkout_time_total'] / checkouts if checkouts else 0.0
+        stats['min_connections'] = self.min_connections
+        stats['max_connections'] = self.max_connections
+        return stats
+
+    def close_all(self):
+        """Close all pooled connections"""
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+            self._last_used.clear()
+
+    def execute_query(self, query, params=None, fetch=True):
+        """Execute a query and return results"""
+        with request_metrics.query_timer(), self.connection() as conn:
+            try:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    cursor.execute(query, params)
+                    if fetch:
+                        result = cursor.fetchall()
+                        # Commit ook bij fetch, anders rolt de pool INSERT ... RETURNING terug
+                        conn.commit()
+                        return [dict(row) for row in result]
+                    else:
+                        conn.commit()
+                        return cursor.rowcount
+            except Exception as e:
+                if not conn.closed:
+                    conn.rollback()
+                raise e
+
+
+class ChangeListener:
+    """Background thread that LISTENs on catalog_changes and low_stock and passes every change to callbacks
+
+    Callbacks get the notify payload as a dict ({'table', 'op', 'id', ...}, op LOW_STOCK for the
+    low_stock channel), or None after a reconnect: changes made while disconnected were missed,
+    so everything should be refreshed.
+    """
+
+    def __init__(self, connection_params, channels=('catalog_changes', 'low_stock')):
+        self.connection_params = connection_params
+        self.channels = channels
+        self.timeout = float(os.getenv('DB_LISTEN_TIMEOUT', '30'))
+        self._callbacks = []
+        self._reset()
+        # De thread van de parent bestaat niet in een geforkte worker, daar opnieuw starten
+        os.register_at_fork(after_in_child=self._restart)
+
+    def _reset(self):
+        """Start without a thread or connection"""
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._stats = {'connected': 0, 'changes': 0, 'reconnects': 0}
+
+    def _restart(self):
+        """Start a fresh thread in a forked worker if anyone was subscribed"""
+        self._reset()
+        if self._callbacks:
+            self.start()
+
+    def subscribe(self, callback):
+        """Call callback for every change from now on, returns a function that unsubscribes"""
+        self._callbacks.append(callback)
+        self.start()
+        return lambda: self._callbacks.remove(callback)
+
+    def start(self):
+        """Start the listener thread if it is not running yet"""
+        with self._lock:
+            if self._thread is None:
+                warn_transaction_pooler(self.connection_params)
+                self._thread = threading.Thread(target=self._run, name='db-listen', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the listener thread (within timeout seconds)"""
+        self._stopped.set()
+
+    def stats(self):
+        """Connection state and counters for /metrics"""
+        return dict(self._stats)
+
+    def _dispatch(self, change):
+        """Hand one change to every callback, a failing callback does not stop the others"""
+        for callback in list(self._callbacks):
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"⚠️ Fout bij verwerken van database wijziging: {e}")
+
+    def _run(self):
+        """Listen until stopped, reconnecting with backoff when the connection drops"""
+        failures = 0
+        connected_before = False
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**self.connection_params)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    for channel in self.channels:
+                        cursor.execute(f"LISTEN {channel};")
+                self._stats['connected'] = 1
+                # Na een herverbinding kunnen wijzigingen gemist zijn
+                if connected_before:
+                    self._stats['reconnects'] += 1
+                    self._dispatch(None)
+                connected_before = True
+                failures = 0
+
+                while not self._stopped.is_set():
+                    if not select.select([conn], [], [], self.timeout)[0]:
+                        # Stil kanaal: controleren of de connectie nog leeft
+                        with conn.cursor() as cursor:
+                            cursor.execute("SELECT 1;")
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._stats['changes'] += 1
+                        notify = conn.notifies.pop(0)
+                        change = json.loads(notify.payload)
+                        self._dispatch(low_stock_change(change) if notify.channel == 'low_stock' else change)
+            except (psycopg2.Error, OSError) as e:
+                self._stats['connected'] = 0
+                failures += 1
+                delay = min(30, 2 ** failures)
+                reason = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+                print(f"⚠️ LISTEN {', '.join(self.channels)} verbroken ({reason}), opnieuw over {delay}s")
+                self._stopped.wait(delay)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+class PostgresStorage(Storage):
+    name = 'postgres'
+
+    def __init__(self):
+        self.db = DatabaseConnection()
+        self.changes = ChangeListener(self.db.connection_params)
+
+    def pool_stats(self):
+        """Connection pool counters for /metrics"""
+        return self.db.pool_stats()
+
+    def close_all(self):
+        """Close all pooled connections"""
+        self.db.close_all()
+
+    def subscribe_changes(self, callback):
+        """Call callback for every row change in tires/reservations and every low-stock event, from any process"""
+        return self.changes.subscribe(callback)
+
+    def change_stats(self):
+        """Change listener counters for /metrics"""
+        return self.changes.stats()
+
+    def setup(self):
+        """Check the connection and the schema version (migrations run via migrations.py)"""
+        try:
+            with self.db.connection() as conn:
+                version = current_version(conn)
+            print("✅ Database connectie succesvol!")
+
+            latest = latest_version()
+            if version < latest:
+                print(f"⚠️ Database schema is versie {version}, nieuwste is {latest}")
+                print("🔧 Voer 'python migrations.py' uit om het schema bij te werken")
+        except Exception as e:
+            print(f"❌ Database connectie fout: {e}")
+            print("🔧 Controleer je .env bestand en database instellingen")
+
+    def _keyset(self, query, clauses, params, columns, limit=None, after=None, before=None):
+        """Run a query with (column, id) keyset pagination, newest first"""
+        clauses = list(clauses)
+        params = list(params)
+        if after:
+            clauses.append(f"({columns[0]}, {columns[1]}) < (%s, %s)")
+            params.extend(after)
+        elif before:
+            clauses.append(f"({columns[0]}, {columns[1]}) > (%s, %s)")
+            params.extend(before)
+        if clauses:
+            query = f"{query} WHERE {' AND '.join(clauses)}"
+
+        # Bij terugbladeren oplopend ophalen en daarna omdraaien
+        direction = "ASC" if before and not after else "DESC"
+        query = f"{query} ORDER BY {columns[0]} {direction}, {columns[1]} {direction}"
+        if limit:
+            query = f"{query} LIMIT %s"
+            params.append(limit)
+
+        rows = self.db.execute_query(query + ";", params)
+        if direction == "ASC":
+            rows.reverse()
+        return rows
+
+    def get_all_tires(self, condition='all', limit=None, after=None, before=None):
+        """Get all tires, optionally filtered by condition"""
+        if condition == 'all':
+            return self._keyset("SELECT * FROM tires", [], [], ('created_at', 'id'),
+                                limit, after, before)
+        return self._keyset("SELECT * FROM tires", ["condition = %s"], [condition],
+                            ('created_at', 'id'), limit, after, before)
+
+    def get_tire_by_id(self, tire_id):
+        """Get tire by ID"""
+        result = self.db.execute_query("SELECT * FROM tires WHERE id = %s;", (tire_id,))
+        return result[0] if result else None
+
+    def get_available_tires(self):
+        """Get tires with stock > 0"""
+        return self.db.execute_query("SELECT * FROM tires WHERE stock > 0 ORDER BY brand, size;")
+
+    def add_tire(self, data):
+        """Add a new tire to inventory"""
+        query = """
+        INSERT INTO tires (brand, size, tire_type, condition, stock, price, low_stock_threshold)
+        VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id;
+        """
+        return self.db.execute_query(query, (
+            data['brand'], data['size'], data['tire_type'],
+            data['condition'], data['stock'], data['price'],
+            data.get('low_stock_threshold', LOW_STOCK_THRESHOLD)
+        ))[0]['id']
+
+    def update_tire(self, tire_id, data):
+        """Update tire information"""
+        query = """
+        UPDATE tires
+        SET brand = %s, size = %s, tire_type = %s, condition = %s, stock = %s, price = %s,
+            low_stock_threshold = %s
+        WHERE id = %s;
+        """
+        return self.db.execute_query(query, (
+            data['brand'], data['size'], data['tire_type'],
+            data['condition'], data['stock'], data['price'],
+            data.get('low_stock_threshold', LOW_STOCK_THRESHOLD), tire_id
+        ), fetch=False)
+
+    def delete_tire(self, tire_id):
+        """Delete a tire from inventory"""
+        return self.db.execute_query("DELETE FROM tires WHERE id = %s;", (tire_id,), fetch=False)
+
+    def import_tires(self, rows):
+        """Insert rows without an ID and update rows with one, in batches in one transaction"""
+        columns = ('brand', 'size', 'tire_type', 'condition', 'stock', 'price', 'low_stock_threshold')
+        inserts = [tuple(tire[c] for c in columns) for _, tire in rows if 'id' not in tire]
+        updates = [(number, tire) for number, tire in rows if 'id' in tire]
+        report = {'inserted': 0, 'updated': 0, 'errors': [], 'ids': []}
+        if not rows:
+            return report
+
+        updated_ids = set()
+        with request_metrics.query_timer(), self.db.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    if inserts:
+                        returned = execute_values(cursor, f"""
+                        INSERT INTO tires ({', '.join(columns)}) VALUES %s RETURNING id;
+                        """, inserts, page_size=IMPORT_BATCH_SIZE, fetch=True)
+                        report['ids'] = [row[0] for row in returned]
+                        report['inserted'] = len(inserts)
+                    if updates:
+                        # Eén set-based UPDATE per batch, RETURNING geeft de gevonden ids terug
+                        returned = execute_values(cursor, """
+                        UPDATE tires
+                        SET brand = v.brand, size = v.size, tire_type = v.tire_type,
+                            condition = v.condition, stock = v.stock, price = v.price,
+                            low_stock_threshold = v.low_stock_threshold
+                        FROM (VALUES %s) AS v(id, brand, size, tire_type, condition, stock, price,
+                                              low_stock_threshold)
+                        WHERE tires.id = v.id
+                        RETURNING tires.id;
+                        """, [(tire['id'],) + tuple(tire[c] for c in columns) for _, tire in updates],
+                            template="(%s::INTEGER, %s, %s, %s, %s, %s::INTEGER, %s::DECIMAL, %s::INTEGER)",
+                            page_size=IMPORT_BATCH_SIZE, fetch=True)
+                        updated_ids = {row[0] for row in returned}
+                        report['updated'] = len(updated_ids)
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+
+        report['errors'] = [
+            {'row': number, 'error': f"Band met ID {tire['id']} bestaat niet"}
+            for number, tire in updates if tire['id'] not in updated_ids
+        ]
+        return report
+
+    def reserve_tire(self, data):
+        """Reserve a tire for a customer, returns the reservation with remaining_stock"""
+        # Voorraad verlagen en reservering aanmaken in één atomaire aanroep
+        query = "SELECT * FROM reserve_tire(%s, %s, %s, %s);"
+        try:
+            result = self.db.execute_query(query, (
+                data['tire_id'], data['customer_name'],
+                data['reservation_date'], data['notes']
+            ))
+        except psycopg2.errors.RaiseException:
+            raise Exception("Tire not available")
+        return result[0]
+
+    def adjust_stock(self, adjustments):
+        """Apply many stock deltas/absolute counts in one transaction, returns the new stock levels"""
+        query = "SELECT * FROM adjust_stock(%s);"
+        try:
+            return self.db.execute_query(query, (json.dumps(adjustments),))
+        except psycopg2.errors.RaiseException as e:
+            raise Exception(e.diag.message_primary)
+        except psycopg2.errors.CheckViolation:
+            raise Exception("Stock cannot become negative")
+
+    def get_tires_by_ids(self, ids):
+        """Get many tires by ID in one query"""
+        return self.db.execute_query("SELECT * FROM tires WHERE id = ANY(%s);", (list(ids),))
+
+    def update_tires(self, updates):
+        """Change only the named columns of many tires in one statement, returns the ids that existed"""
+        rows = self.db.execute_query("SELECT id FROM update_tires(%s);", (json.dumps(updates),))
+        return [row['id'] for row in rows]
+
+    def delete_tires(self, ids):
+        """Delete many tires in one statement, returns the ids that existed"""
+        rows = self.db.execute_query("DELETE FROM tires WHERE id = ANY(%s) RETURNING id;", (list(ids),))
+        return [row['id'] for row in rows]
+
+    def reserve_tires(self, reservations):
+        """Reserve many tires in one call and one transaction, in order"""
+        rows = self.db.execute_query("SELECT * FROM reserve_tires(%s) ORDER BY item;",
+                                     (json.dumps(reservations),))
+        return [{'id': row['id'], 'remaining_stock': row['remaining_stock'] if row['id'] else None}
+                for row in rows]
+
+    def get_reservations(self, customer_name=None, limit=None, after=None, before=None):
+        """Get all reservations, optionally filtered by customer"""
+        # Band als geneste 'tires' dict, zelfde vorm als Supabase '*, tires(*)'
+        query = """
+        SELECT r.*, row_to_json(t) AS tires
+        FROM reservations r
+        JOIN tires t ON r.tire_id = t.id
+        """
+        if customer_name:
+            rows = self._keyset(query, ["r.customer_name = %s"], [customer_name],
+                                ('r.reservation_date', 'r.id'), limit, after, before)
+        else:
+            rows = self._keyset(query, [], [], ('r.reservation_date', 'r.id'), limit, after, before)
+        return [parse_timestamps(row) for row in rows]
+
+    def _search_conditions(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                           size_filter=None):
+        """Build the WHERE conditions and parameters used by search and export"""
+        clauses = []
+        params = []
+
+        # Zoeken in merk, maat en type gaat via search_tires() in de database
+        if search:
+            params.append(search)
+
+        # Filter op conditie
+        if condition:
+            clauses.append("condition = %s")
+            params.append(condition)
+
+        # Filter op type
+        if tire_type:
+            clauses.append("tire_type = %s")
+            params.append(tire_type)
+
+        # Filter op voorraad
+        if stock_filter == 'in_stock':
+            clauses.append("stock > 0")
+        elif stock_filter == 'low_stock':
+            clauses.append("stock > 0 AND below_threshold")
+        elif stock_filter == 'out_of_stock':
+            clauses.append("stock = 0")
+
+        # Filter op maat (breedte, hoogte, velg)
+        for name, value in (size_filter or {}).items():
+            column, operator = SIZE_FILTERS[name]
+            clauses.append(f"{column} {operator} %s")
+            params.append(value)
+
+        return clauses, params
+
+    def _search_source(self, search=None):
+        """FROM source for search: ranked trigram matches or the plain table"""
+        return "search_tires(%s) AS t" if search else "tires"
+
+    def search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                     size_filter=None, limit=None, after=None, before=None):
+        """Search and filter tires"""
+        clauses, params = self._search_conditions(search, condition, tire_type, stock_filter,
+                                                  size_filter)
+        return self._keyset(f"SELECT * FROM {self._search_source(search)}", clauses, params,
+                            (sort_column(search), 'id'), limit, after, before)
+
+    def iter_search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                          size_filter=None, page_size=500):
+        """Yield filtered tires through a server-side cursor instead of loading them all at once"""
+        clauses, params = self._search_conditions(search, condition, tire_type, stock_filter,
+                                                  size_filter)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = sort_column(search)
+        query = f"SELECT * FROM {self._search_source(search)} {where} ORDER BY {order} DESC, id DESC;"
+        with self.db.connection() as conn:
+            try:
+                # Named cursor: rijen komen per page_size uit de database
+                with conn.cursor(name='tires_export', cursor_factory=RealDictCursor) as cursor:
+                    cursor.itersize = page_size
+                    with request_metrics.query_timer():
+                        cursor.execute(query, params)
+                    for row in cursor:
+                        yield row
+            finally:
+                if not conn.closed:
+                    conn.rollback()
+
+    def get_inventory_stats(self):
+        """Get inventory statistics"""
+        return self.db.execute_query("SELECT * FROM inventory_stats();")[0]
+
+    def get_homepage(self, limit=None, after=None, before=None):
+        """Get one page of tires (all conditions) and the inventory stats in one query"""
+        after_value, after_id = after or (None, None)
+        before_value, before_id = before or (None, None)
+        query = "SELECT homepage_tires(%s, %s, %s, %s, %s) AS homepage;"
+        homepage = self.db.execute_query(query, (
+            limit, after_value, after_id, before_value, before_id
+        ))[0]['homepage']
+        # Banden komen als JSON terug, tijden dus als tekst
+        homepage['tires'] = [parse_timestamps(tire) for tire in homepage['tires']]
+        return homepage
+
+    def get_catalog_version(self):
+        """Counts and latest change of tires and reservations"""
+        return self.db.execute_query("SELECT * FROM catalog_version();")[0]
+
+    def get_low_stock(self, limit=None):
+        """Tires below their low_stock_threshold, lowest stock first (partial index)"""
+        query = "SELECT * FROM tires WHERE below_threshold ORDER BY stock, id"
+        if limit:
+            return self.db.execute_query(query + " LIMIT %s;", (limit,))
+        return self.db.execute_query(query + ";")
+
+    def listen_low_stock(self, timeout=15):
+        """Yield the events of the notify_low_stock trigger via LISTEN/NOTIFY"""
+        # Eigen connectie buiten de pool: een LISTEN connectie blijft open zolang er geluisterd wordt
+        warn_transaction_pooler(self.db.connection_params)
+        conn = psycopg2.connect(**self.db.connection_params)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute("LISTEN low_stock;")
+            while True:
+                if not select.select([conn], [], [], timeout)[0]:
+                    yield None
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    yield json.loads(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
@@ -0,0 +1,606 @@
+"""
+SQLite storage engine: lokaal databasebestand voor kleine installaties
+
+Zelfde tabellen, CHECKs, indexes en gegenereerde kolommen als database_setup.sql.
+Het schema wordt bij de eerste connectie aangemaakt en bijgewerkt via PRAGMA user_version.
+De functies uit database_setup.sql (reserve_tire, adjust_stock, ...) zijn hier Python
+methodes die hun statements in één BEGIN IMMEDIATE transactie uitvoeren.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+from metrics import request_metrics
+from storage import (Storage, SIZE_FILTERS, IMPORT_BATCH_SIZE, LOW_STOCK_THRESHOLD, sort_column,
+                     parse_timestamps)
+
+# Tijden als tekst in één vast formaat (UTC, microseconden), dan is tekstvolgorde ook tijdvolgorde
+NOW = "(strftime('%Y-%m-%d %H:%M:%f', 'now') || '000+00:00')"
+
+# Zelfde grens als pg_trgm.word_similarity_threshold voor de <% operator
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+TIRE_COLUMNS = ('id', 'brand', 'size', 'tire_type', 'condition', 'stock', 'price',
+                'created_at', 'updated_at', 'width', 'aspect_ratio', 'rim_diameter',
+                'load_index', 'speed_index', 'search_text', 'low_stock_threshold', 'below_threshold')
+
+# Schema stappen, versie = positie in de lijst (1, 2, ...); alleen nieuwe stappen toevoegen
+SCHEMA = [
+    f"""
+    CREATE TABLE tires (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        brand VARCHAR(100) NOT NULL CHECK (length(brand) <= 100),
+        size VARCHAR(50) NOT NULL CHECK (length(size) <= 50),
+        tire_type VARCHAR(20) NOT NULL CHECK (tire_type IN ('zomer', 'winter', 'all_season')),
+        condition VARCHAR(10) NOT NULL CHECK (condition IN ('new', 'used')),
+        stock INTEGER NOT NULL DEFAULT 0 CHECK (stock >= 0),
+        price DECIMAL(10,2),
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT {NOW},
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT {NOW},
+        width SMALLINT
+            GENERATED ALWAYS AS (CAST(regexp_substr(upper(size), '^(\\d{{3}})/') AS INTEGER)) STORED,
+        aspect_ratio SMALLINT
+            GENERATED ALWAYS AS (CAST(regexp_substr(upper(size), '^\\d{{3}}/(\\d{{2}})') AS INTEGER)) STORED,
+        rim_diameter SMALLINT
+            GENERATED ALWAYS AS (CAST(regexp_substr(upper(size), '^\\d{{3}}/\\d{{2}}\\s*Z?R\\s*(\\d{{2}})') AS INTEGER)) STORED,
+        load_index SMALLINT
+            GENERATED ALWAYS AS (CAST(regexp_substr(upper(size), '^\\d{{3}}/\\d{{2}}\\s*Z?R\\s*\\d{{2}}\\s+(\\d{{2,3}})') AS INTEGER)) STORED,
+        speed_index CHAR(1)
+            GENERATED ALWAYS AS (regexp_substr(upper(size), '^\\d{{3}}/\\d{{2}}\\s*Z?R\\s*\\d{{2}}\\s+\\d{{2,3}}\\s*([A-Z])')) STORED,
+        search_text TEXT
+            GENERATED ALWAYS AS (lower(brand || ' ' || size || ' ' || tire_type)) STORED
+    );
+
+    CREATE TABLE reservations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tire_id INTEGER NOT NULL REFERENCES tires(id) ON DELETE CASCADE,
+        customer_name VARCHAR(100) NOT NULL CHECK (length(customer_name) <= 100),
+        reservation_date DATE NOT NULL,
+        notes TEXT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT {NOW}
+    );
+
+    CREATE INDEX idx_tires_condition ON tires(condition);
+    CREATE INDEX idx_tires_brand ON tires(brand);
+    CREATE INDEX idx_tires_stock ON tires(stock);
+    CREATE INDEX idx_reservations_customer ON reservations(customer_name);
+    CREATE INDEX idx_reservations_date ON reservations(reservation_date);
+    CREATE INDEX idx_reservations_tire ON reservations(tire_id);
+
+    CREATE INDEX idx_tires_created_id ON tires(created_at DESC, id DESC);
+    CREATE INDEX idx_tires_condition_created_id ON tires(condition, created_at DESC, id DESC);
+    CREATE INDEX idx_reservations_date_id ON reservations(reservation_date DESC, id DESC);
+
+    CREATE INDEX idx_tires_size_dims ON tires(rim_diameter, width, aspect_ratio);
+    CREATE INDEX idx_tires_width ON tires(width);
+
+    -- Geen trigram index in SQLite: zoeken scant search_text, wat lokaal snel genoeg is
+    CREATE INDEX idx_tires_search_text ON tires(search_text);
+
+    -- recursive_triggers staat uit, de UPDATE in de trigger start hem niet opnieuw
+    CREATE TRIGGER update_tires_updated_at
+        AFTER UPDATE ON tires
+        FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN
+        UPDATE tires SET updated_at = {NOW} WHERE id = NEW.id;
+    END;
+    """,
+    """
+    CREATE INDEX idx_tires_updated_at ON tires(updated_at);
+    CREATE INDEX idx_reservations_created_at ON reservations(created_at);
+    """,
+    """
+    ALTER TABLE tires ADD COLUMN low_stock_threshold INTEGER NOT NULL DEFAULT 5
+        CHECK (low_stock_threshold >= 0);
+    ALTER TABLE tires ADD COLUMN below_threshold BOOLEAN
+        GENERATED ALWAYS AS (stock < low_stock_threshold) VIRTUAL;
+    CREATE INDEX idx_tires_low_stock ON tires(stock, id) WHERE below_threshold;
+    """,
+]
+
+
+def regexp_substr(text, pattern):
+    """First capture group of pattern in text, like substring(text from pattern) in PostgreSQL"""
+    if text is None:
+        return None
+    match = re.search(pattern, text)
+    return match.group(1) if match else None
+
+
+@lru_cache(maxsize=65536)
+def trigrams(text):
+    """Ordered trigrams of each word, padded like pg_trgm ('  w', ' wo', ..., 'rd ')"""
+    result = []
+    for word in re.findall(r'[^\W_]+', text.lower()):
+        padded = f"  {word} "
+        result.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return tuple(result)
+
+
+def word_similarity(search, text):
+    """Best trigram similarity between search and a continuous extent of text, as in pg_trgm"""
+    if not search or not text:
+        return 0.0
+    wanted = set(trigrams(search))
+    ordered = trigrams(text)
+    # Een extent begint en eindigt op een gedeelde trigram, anders wordt hij alleen slechter
+    positions = [i for i, trigram in enumerate(ordered) if trigram in wanted]
+    best = 0.0
+    for start_index, start in enumerate(positions):
+        extent = set()
+        previous = start
+        for end in positions[start_index:]:
+            extent.update(ordered[previous:end + 1])
+            previous = end + 1
+            common = len(extent & wanted)
+            best = max(best, common / (len(wanted) + len(extent) - common))
+    return best
+
+
+def escape_like(text):
+    """Search text for LIKE ... ESCAPE '\\', so % and _ match themselves (as escape_like() in PostgreSQL)"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def convert_row(row):
+    """Row as a dict shaped like the other engines: datetimes, and below_threshold as bool instead of 0/1"""
+    row = parse_timestamps(dict(row))
+    if row.get('below_threshold') is not None:
+        row['below_threshold'] = bool(row['below_threshold'])
+    return row
+
+
+class SQLiteStorage(Storage):
+    name = 'sqlite'
+
+    def __init__(self):
+        self.path = os.getenv('SQLITE_PATH', 'bandenvoorraad.db')
+        self.busy_timeout = float(os.getenv('SQLITE_BUSY_TIMEOUT', '5'))
+        self._reset_connections()
+        os.register_at_fork(after_in_child=self._reset_connections)
+
+    def _reset_connections(self):
+        """Start without connections, also in a forked worker"""
+        # Een SQLite connectie mag niet over een fork heen gebruikt worden
+        self._idle = []
+        self._all = []
+        self._lock = threading.Lock()
+        self._schema_checked = False
+
+    def _connect(self):
+        """Open a connection with WAL and the functions the schema uses"""
+        # isolation_level=None: autocommit, schrijfacties openen zelf een transactie
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.create_function('regexp_substr', 2, regexp_substr, deterministic=True)
+        conn.create_function('word_similarity', 2, word_similarity, deterministic=True)
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute("PRAGMA foreign_keys = ON;")
+        return conn
+
+    def _migrate(self, conn):
+        """Apply the pending SCHEMA steps, each in its own transaction, returns the schema version"""
+        version = conn.execute("PRAGMA user_version;").fetchone()[0]
+        for number, step in enumerate(SCHEMA[version:], start=version + 1):
+            # executescript commit een open transactie eerst, dus BEGIN hoort in het script zelf
+            try:
+                conn.executescript(f"BEGIN IMMEDIATE;\n{step}\nPRAGMA user_version = {number};\nCOMMIT;")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK;")
+                # Een ander proces kan deze stap net tegelijk hebben uitgevoerd
+                if conn.execute("PRAGMA user_version;").fetchone()[0] < number:
+                    raise
+        return len(SCHEMA)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, each thread uses its own while it holds one"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+            with self._lock:
+                self._all.append(conn)
+                if not self._schema_checked:
+                    self._migrate(conn)
+                    self._schema_checked = True
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            with self._lock:
+                self._idle.append(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction: BEGIN IMMEDIATE takes the write lock up front"""
+        with request_metrics.query_timer(), self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                yield conn
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+
+    def close_all(self):
+        """Close all connections"""
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._idle = []
+            self._all = []
+
+    def execute_query(self, query, params=(), fetch=True):
+        """Execute a single statement and return rows as dicts (or the row count)"""
+        with request_metrics.query_timer(), self.connection() as conn:
+            cursor = conn.execute(query, params)
+            if fetch:
+                return [convert_row(row) for row in cursor.fetchall()]
+            return cursor.rowcount
+
+    def setup(self):
+        """Open the database file and create or update the schema"""
+        try:
+            with self.connection() as conn:
+                mode = conn.execute("PRAGMA journal_mode;").fetchone()[0]
+            print(f"✅ SQLite database {self.path} (schema versie {len(SCHEMA)}, {mode})")
+        except Exception as e:
+            print(f"❌ SQLite database fout: {e}")
+            print("🔧 Controleer SQLITE_PATH in je .env bestand")
+
+    def _keyset(self, query, clauses, params, columns, limit=None, after=None, before=None):
+        """Run a query with (column, id) keyset pagination, newest first"""
+        clauses = list(clauses)
+        params = list(params)
+        if after:
+            clauses.append(f"({columns[0]}, {columns[1]}) < (?, ?)")
+            params.extend(after)
+        elif before:
+            clauses.append(f"({columns[0]}, {columns[1]}) > (?, ?)")
+            params.extend(before)
+        if clauses:
+            query = f"{query} WHERE {' AND '.join(clauses)}"
+
+        # Bij terugbladeren oplopend ophalen en daarna omdraaien
+        direction = "ASC" if before and not after else "DESC"
+        query = f"{query} ORDER BY {columns[0]} {direction}, {columns[1]} {direction}"
+        if limit:
+            query = f"{query} LIMIT ?"
+            params.append(limit)
+
+        rows = self.execute_query(query + ";", params)
+        if direction == "ASC":
+            rows.reverse()
+        return rows
+
+    def get_all_tires(self, condition='all', limit=None, after=None, before=None):
+        """Get all tires, optionally filtered by condition"""
+        if condition == 'all':
+            return self._keyset("SELECT * FROM tires", [], [], ('created_at', 'id'),
+                                limit, after, before)
+        return self._keyset("SELECT * FROM tires", ["condition = ?"], [condition],
+                            ('created_at', 'id'), limit, after, before)
+
+    def get_tire_by_id(self, tire_id):
+        """Get tire by ID"""
+        result = self.execute_query("SELECT * FROM tires WHERE id = ?;", (tire_id,))
+        return result[0] if result else None
+
+    def get_available_tires(self):
+        """Get tires with stock > 0"""
+        return self.execute_query("SELECT * FROM tires WHERE stock > 0 ORDER BY brand, size;")
+
+    def add_tire(self, data):
+        """Add a new tire to inventory"""
+        query = """
+        INSERT INTO tires (brand, size, tire_type, condition, stock, price, low_stock_threshold)
+        VALUES (?, ?, ?, ?, ?, ?, ?) RETURNING id;
+        """
+        return self.execute_query(query, (
+            data['brand'], data['size'], data['tire_type'],
+            data['condition'], data['stock'], data['price'],
+            data.get('low_stock_threshold', LOW_STOCK_THRESHOLD)
+        ))[0]['id']
+
+    def update_tire(self, tire_id, data):
+        """Update tire information"""
+        query = """
+        UPDATE tires
+        SET brand = ?, size = ?, tire_type = ?, condition = ?, stock = ?, price = ?,
+            low_stock_threshold = ?
+        WHERE id = ?;
+        """
+        return self.execute_query(query, (
+            data['brand'], data['size'], data['tire_type'],
+            data['condition'], data['stock'], data['price'],
+            data.get('low_stock_threshold', LOW_STOCK_THRESHOLD), tire_id
+        ), fetch=False)
+
+    def delete_tire(self, tire_id):
+        """Delete a tire from inventory (reservations go with it via ON DELETE CASCADE)"""
+        return self.execute_query("DELETE FROM tires WHERE id = ?;", (tire_id,), fetch=False)
+
+    def import_tires(self, rows):
+        """Insert rows without an ID and update rows with one, in batches in one transaction"""
+        columns = ('brand', 'size', 'tire_type', 'condition', 'stock', 'price', 'low_stock_threshold')
+        inserts = [tuple(tire[c] for c in columns) for _, tire in rows if 'id' not in tire]
+        updates = [(number, tire) for number, tire in rows if 'id' in tire]
+        report = {'inserted': 0, 'updated': 0, 'errors': [], 'ids': []}
+        if not rows:
+            return report
+
+        existing = set()
+        with self.transaction() as conn:
+            # Per rij met RETURNING voor de nieuwe ids, lokaal kost dat geen round trips
+            for tire in inserts:
+                report['ids'].append(conn.execute(f"""
+                INSERT INTO tires ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) RETURNING id;
+                """, tire).fetchone()['id'])
+            report['inserted'] = len(inserts)
+
+            # Bestaande ids binnen dezelfde transactie opzoeken, onbekende ids worden fouten
+            ids = [tire['id'] for _, tire in updates]
+            for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+                batch = ids[start:start + IMPORT_BATCH_SIZE]
+                cursor = conn.execute(
+                    f"SELECT id FROM tires WHERE id IN ({', '.join('?' * len(batch))});", batch)
+                existing.update(row['id'] for row in cursor)
+            if existing:
+                conn.executemany(f"""
+                UPDATE tires SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?;
+                """, [tuple(tire[c] for c in columns) + (tire['id'],)
+                      for _, tire in updates if tire['id'] in existing])
+                report['updated'] = len(existing)
+
+        report['errors'] = [
+            {'row': number, 'error': f"Band met ID {tire['id']} bestaat niet"}
+            for number, tire in updates if tire['id'] not in existing
+        ]
+        return report
+
+    def reserve_tire(self, data):
+        """Reserve a tire for a customer, returns the reservation with remaining_stock"""
+        # Voorraad verlagen en reservering aanmaken in één transactie
+        with self.transaction() as conn:
+            row = conn.execute(
+                "UPDATE tires SET stock = stock - 1 WHERE id = ? AND stock > 0 RETURNING stock;",
+                (data['tire_id'],)
+            ).fetchall()
+            if not row:
+                raise Exception("Tire not available")
+            reservation = dict(conn.execute("""
+            INSERT INTO reservations (tire_id, customer_name, reservation_date, notes)
+            VALUES (?, ?, ?, ?) RETURNING *;
+            """, (
+                data['tire_id'], data['customer_name'],
+                data['reservation_date'], data['notes']
+            )).fetchall()[0])
+        reservation['remaining_stock'] = row[0]['stock']
+        return parse_timestamps(reservation)
+
+    def adjust_stock(self, adjustments):
+        """Apply many stock deltas/absolute counts in one transaction, returns the new stock levels"""
+        ids = [adjustment['tire_id'] for adjustment in adjustments]
+        placeholders = ', '.join('?' * len(ids))
+        try:
+            with self.transaction() as conn:
+                found = {row['id'] for row in conn.execute(
+                    f"SELECT id FROM tires WHERE id IN ({placeholders});", ids)}
+                missing = [str(tire_id) for tire_id in ids if tire_id not in found]
+                if missing:
+                    raise Exception(f"Tires not found: {', '.join(missing)}")
+
+                # Absolute stock wint van delta; negatieve voorraad faalt op de CHECK constraint
+                conn.executemany(
+                    "UPDATE tires SET stock = COALESCE(?, stock + ?) WHERE id = ?;",
+                    [(adjustment.get('stock'), adjustment.get('delta'), adjustment['tire_id'])
+                     for adjustment in adjustments]
+                )
+                return [dict(row) for row in conn.execute(
+                    f"SELECT id, stock FROM tires WHERE id IN ({placeholders});", ids)]
+        except sqlite3.IntegrityError:
+            raise Exception("Stock cannot become negative")
+
+    def get_tires_by_ids(self, ids):
+        """Get many tires by ID, in batches to stay under SQLite's parameter limit"""
+        ids = list(ids)
+        tires = []
+        for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+            batch = ids[start:start + IMPORT_BATCH_SIZE]
+            tires.extend(self.execute_query(
+                f"SELECT * FROM tires WHERE id IN ({', '.join('?' * len(batch))});", batch))
+        return tires
+
+    def update_tires(self, updates):
+        """Change only the named columns of many tires in one transaction, returns the ids that existed"""
+        columns = ('brand', 'size', 'tire_type', 'condition', 'stock', 'price', 'low_stock_threshold')
+        updated = []
+        with self.transaction() as conn:
+            for update in updates:
+                named = [c for c in columns if c in update]
+                row = conn.execute(
+                    f"UPDATE tires SET {', '.join(f'{c} = ?' for c in named)} WHERE id = ? RETURNING id;",
+                    [update[c] for c in named] + [update['id']]
+                ).fetchone()
+                if row:
+                    updated.append(row['id'])
+        return updated
+
+    def delete_tires(self, ids):
+        """Delete many tires in one transaction, returns the ids that existed"""
+        ids = list(ids)
+        deleted = []
+        with self.transaction() as conn:
+            for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+                batch = ids[start:start + IMPORT_BATCH_SIZE]
+                deleted.extend(row['id'] for row in conn.execute(
+                    f"DELETE FROM tires WHERE id IN ({', '.join('?' * len(batch))}) RETURNING id;", batch))
+        return deleted
+
+    def reserve_tires(self, reservations):
+        """Reserve many tires in one transaction, in order"""
+        results = []
+        with self.transaction() as conn:
+            for data in reservations:
+                row = conn.execute(
+                    "UPDATE tires SET stock = stock - 1 WHERE id = ? AND stock > 0 RETURNING stock;",
+                    (data['tire_id'],)
+                ).fetchall()
+                if not row:
+                    results.append({'id': None, 'remaining_stock': None})
+                    continue
+                reservation = conn.execute("""
+                INSERT INTO reservations (tire_id, customer_name, reservation_date, notes)
+                VALUES (?, ?, ?, ?) RETURNING id;
+                """, (
+                    data['tire_id'], data['customer_name'],
+                    data['reservation_date'], data.get('notes', '')
+                )).fetchall()[0]
+                results.append({'id': reservation['id'], 'remaining_stock': row[0]['stock']})
+        return results
+
+    def get_reservations(self, customer_name=None, limit=None, after=None, before=None):
+        """Get all reservations, optionally filtered by customer"""
+        # Band als geneste 'tires' dict, zelfde vorm als Supabase '*, tires(*)'
+        tire_json = ', '.join(f"'{column}', t.{column}" for column in TIRE_COLUMNS)
+        query = f"""
+        SELECT r.*, json_object({tire_json}) AS tires
+        FROM reservations r
+        JOIN tires t ON r.tire_id = t.id
+        """
+        if customer_name:
+            rows = self._keyset(query, ["r.customer_name = ?"], [customer_name],
+                                ('r.reservation_date', 'r.id'), limit, after, before)
+        else:
+            rows = self._keyset(query, [], [], ('r.reservation_date', 'r.id'), limit, after, before)
+        for row in rows:
+            row['tires'] = convert_row(json.loads(row['tires']))
+        return rows
+
+    def _search_conditions(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                           size_filter=None):
+        """Build the WHERE conditions and parameters used by search and export"""
+        clauses = []
+        params = []
+
+        # Zoekparameters van de subquery in _search_source komen eerst
+        if search:
+            params.extend([escape_like(search), search, escape_like(search), search, WORD_SIMILARITY_THRESHOLD])
+
+        # Filter op conditie
+        if condition:
+            clauses.append("condition = ?")
+            params.append(condition)
+
+        # Filter op type
+        if tire_type:
+            clauses.append("tire_type = ?")
+            params.append(tire_type)
+
+        # Filter op voorraad
+        if stock_filter == 'in_stock':
+            clauses.append("stock > 0")
+        elif stock_filter == 'low_stock':
+            clauses.append("stock > 0 AND below_threshold")
+        elif stock_filter == 'out_of_stock':
+            clauses.append("stock = 0")
+
+        # Filter op maat (breedte, hoogte, velg)
+        for name, value in (size_filter or {}).items():
+            column, operator = SIZE_FILTERS[name]
+            clauses.append(f"{column} {operator} ?")
+            params.append(value)
+
+        return clauses, params
+
+    def _search_source(self, search=None):
+        """FROM source for search: ranked matches (as search_tires() in PostgreSQL) or the plain table"""
+        if not search:
+            return "tires"
+        # CAST geeft search_rank REAL affinity, zodat de cursor tekst als getal vergeleken wordt
+        return """(
+            SELECT *, CAST(ROUND(
+                CASE WHEN search_text LIKE '%' || lower(?) || '%' ESCAPE '\\' THEN 1 ELSE 0 END
+                + word_similarity(lower(?), search_text), 4) AS REAL) AS search_rank
+            FROM tires
+            WHERE search_text LIKE '%' || lower(?) || '%' ESCAPE '\\'
+               OR word_similarity(lower(?), search_text) >= ?
+        ) AS t"""
+
+    def search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                     size_filter=None, limit=None, after=None, before=None):
+        """Search and filter tires"""
+        clauses, params = self._search_conditions(search, condition, tire_type, stock_filter,
+                                                  size_filter)
+        return self._keyset(f"SELECT * FROM {self._search_source(search)}", clauses, params,
+                            (sort_column(search), 'id'), limit, after, before)
+
+    def iter_search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                          size_filter=None, page_size=500):
+        """Yield filtered tires per page_size rows from one open statement"""
+        clauses, params = self._search_conditions(search, condition, tire_type, stock_filter,
+                                                  size_filter)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = sort_column(search)
+        query = f"SELECT * FROM {self._search_source(search)} {where} ORDER BY {order} DESC, id DESC;"
+        with self.connection() as conn:
+            with request_metrics.query_timer():
+                cursor = conn.execute(query, params)
+            # SQLite levert rijen stap voor stap, fetchmany houdt het geheugen klein
+            try:
+                while True:
+                    rows = cursor.fetchmany(page_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield convert_row(row)
+            finally:
+                cursor.close()
+
+    def get_inventory_stats(self):
+        """Get inventory statistics"""
+        return self.execute_query("""
+        SELECT
+            COUNT(*) AS total_tires,
+            COUNT(*) FILTER (WHERE condition = 'new') AS new_tires,
+            COUNT(*) FILTER (WHERE condition = 'used') AS used_tires,
+            COALESCE(SUM(stock), 0) AS total_stock,
+            COUNT(*) FILTER (WHERE stock > 0 AND below_threshold) AS low_stock,
+            COUNT(*) FILTER (WHERE stock = 0) AS out_of_stock
+        FROM tires;
+        """)[0]
+
+    def get_homepage(self, limit=None, after=None, before=None):
+        """Get one page of tires (all conditions) and the inventory stats"""
+        # Lokaal kost een extra query geen round trip, dus geen gecombineerde functie nodig
+        return {
+            'stats': self.get_inventory_stats(),
+            'tires': self.get_all_tires(limit=limit, after=after, before=before)
+        }
+
+    def get_catalog_version(self):
+        """Counts and latest change of tires and reservations"""
+        return self.execute_query("""
+        SELECT
+            (SELECT COUNT(*) FROM tires) AS tire_count,
+            (SELECT MAX(updated_at) FROM tires) AS tires_updated_at,
+            (SELECT COUNT(*) FROM reservations) AS reservation_count,
+            (SELECT MAX(created_at) FROM reservations) AS reservations_created_at;
+        """)[0]
+
+    def get_low_stock(self, limit=None):
+        """Tires below their low_stock_threshold, lowest stock first (partial index)"""
+        query = "SELECT * FROM tires WHERE below_threshold ORDER BY stock, id"
+        if limit:
+            return self.execute_query(query + " LIMIT ?;", (limit,))
+        return self.execute_query(query + ";")
@@ -0,0 +1,326 @@
+"""
+Supabase storage engine: alle reads en writes via de REST API (PostgREST)
+"""
+
+import os
+import threading
+
+from werkzeug.local import LocalProxy
+from supabase import create_client, Client
+from postgrest.exceptions import APIError
+
+from metrics import request_metrics
+from storage import (Storage, SIZE_FILTERS, IMPORT_BATCH_SIZE, sort_column, cursor_value,
+                     parse_timestamps)
+
+# Supabase configuration
+supabase_url = os.getenv('SUPABASE_URL', 'https://tfcgwmxiqgnlyjtpymzy.supabase.co')
+supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+_supabase = None
+_supabase_lock = threading.Lock()
+
+
+def get_supabase():
+    """Supabase client for this process, created on first use"""
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                if not supabase_key:
+                    raise Exception("SUPABASE_SERVICE_ROLE_KEY is niet ingesteld")
+                _supabase = create_client(supabase_url, supabase_key)
+    return _supabase
+
+
+def _reset_supabase():
+    """Drop the parent's client after a fork, each worker connects itself"""
+    global _supabase, _supabase_lock
+    _supabase = None
+    _supabase_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_supabase)
+
+# Zelfde gebruik als een client, maar pas verbonden bij de eerste aanroep
+supabase: Client = LocalProxy(get_supabase)
+
+
+def execute(query):
+    """Execute a Supabase request, timed for /metrics"""
+    with request_metrics.query_timer():
+        return query.execute()
+
+
+class SupabaseStorage(Storage):
+    name = 'supabase'
+
+    def setup(self):
+        """Check the connection with a simple query"""
+        if not supabase_key:
+            print("❌ SUPABASE_SERVICE_ROLE_KEY is niet ingesteld!")
+            print("🔧 Maak een .env bestand aan met je Supabase configuratie:")
+            print("   SUPABASE_URL=https://tfcgwmxiqgnlyjtpymzy.supabase.co")
+            print("   SUPABASE_SERVICE_ROLE_KEY=jouw-service-role-key-hier")
+            print("   Ga naar je Supabase dashboard > Settings > API om de service role key te vinden")
+            exit(1)
+        try:
+            supabase.table('tires').select('*').limit(1).execute()
+            print("✅ Database connectie succesvol!")
+        except Exception as e:
+            print(f"❌ Database connectie fout: {e}")
+            print("🔧 Controleer je .env bestand:")
+            print("   - SUPABASE_URL moet correct zijn")
+            print("   - SUPABASE_SERVICE_ROLE_KEY moet correct zijn")
+            print("   - Voer database_setup.sql uit in je Supabase SQL Editor")
+
+    def _keyset(self, query, column, limit=None, after=None, before=None):
+        """Apply (column, id) keyset pagination, newest first"""
+        # postgrest 0.13 heeft nog geen or_(), dus de or=(...) parameter zelf toevoegen
+        if after:
+            value, key = cursor_value(after[0]), after[1]
+            query.params = query.params.add('or', f'({column}.lt."{value}",and({column}.eq."{value}",id.lt.{key}))')
+        elif before:
+            value, key = cursor_value(before[0]), before[1]
+            query.params = query.params.add('or', f'({column}.gt."{value}",and({column}.eq."{value}",id.gt.{key}))')
+
+        # Bij terugbladeren oplopend ophalen en daarna omdraaien; één order=kolom,id parameter,
+        # want twee keer order() geeft twee order parameters en PostgREST gebruikt er maar één
+        direction = '' if before else '.desc'
+        query.params = query.params.add('order', f'{column}{direction},id{direction}')
+        if limit:
+            query = query.limit(limit)
+
+        rows = [parse_timestamps(row) for row in execute(query).data]
+        if before:
+            rows.reverse()
+        return rows
+
+    def get_all_tires(self, condition='all', limit=None, after=None, before=None):
+        """Get all tires, optionally filtered by condition"""
+        query = supabase.table('tires').select('*')
+        if condition != 'all':
+            query = query.eq('condition', condition)
+        return self._keyset(query, 'created_at', limit, after, before)
+
+    def get_tire_by_id(self, tire_id):
+        """Get tire by ID"""
+        result = execute(supabase.table('tires').select('*').eq('id', tire_id))
+        return parse_timestamps(result.data[0]) if result.data else None
+
+    def get_available_tires(self):
+        """Get tires with stock > 0"""
+        result = execute(supabase.table('tires').select('*').gte('stock', 1)
+                         .order('brand').order('size'))
+        return [parse_timestamps(row) for row in result.data]
+
+    def add_tire(self, data):
+        """Add a new tire to inventory"""
+        return execute(supabase.table('tires').insert(data)).data[0]['id']
+
+    def update_tire(self, tire_id, data):
+        """Update tire information"""
+        return len(execute(supabase.table('tires').update(data).eq('id', tire_id)).data)
+
+    def delete_tire(self, tire_id):
+        """Delete a tire from inventory"""
+        return len(execute(supabase.table('tires').delete().eq('id', tire_id)).data)
+
+    def import_tires(self, rows):
+        """Insert rows without an ID and upsert rows with one, in batches"""
+        inserts = [tire for _, tire in rows if 'id' not in tire]
+        updates = [(number, tire) for number, tire in rows if 'id' in tire]
+        report = {'inserted': 0, 'updated': 0, 'errors': [], 'ids': []}
+        if not rows:
+            return report
+
+        # Upsert met onbekende ids zou nieuwe rijen buiten de id sequence aanmaken
+        existing = set()
+        ids = [tire['id'] for _, tire in updates]
+        for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+            batch = ids[start:start + IMPORT_BATCH_SIZE]
+            result = execute(supabase.table('tires').select('id').in_('id', batch))
+            existing.update(row['id'] for row in result.data)
+
+        known = [tire for _, tire in updates if tire['id'] in existing]
+        report['errors'] = [
+            {'row': number, 'error': f"Band met ID {tire['id']} bestaat niet"}
+            for number, tire in updates if tire['id'] not in existing
+        ]
+
+        for start in range(0, len(inserts), IMPORT_BATCH_SIZE):
+            batch = inserts[start:start + IMPORT_BATCH_SIZE]
+            result = execute(supabase.table('tires').insert(batch))
+            report['ids'].extend(row['id'] for row in result.data)
+            report['inserted'] += len(batch)
+        for start in range(0, len(known), IMPORT_BATCH_SIZE):
+            batch = known[start:start + IMPORT_BATCH_SIZE]
+            execute(supabase.table('tires').upsert(batch))
+            report['updated'] += len(batch)
+        return report
+
+    def reserve_tire(self, data):
+        """Reserve a tire for a customer, returns the reservation with remaining_stock"""
+        # Voorraad verlagen en reservering aanmaken in één atomaire aanroep
+        try:
+            result = execute(supabase.rpc('reserve_tire', {
+                'p_tire_id': data['tire_id'],
+                'p_customer_name': data['customer_name'],
+                'p_reservation_date': data['reservation_date'],
+                'p_notes': data['notes']
+            }))
+        except APIError as e:
+            if 'Tire not available' in str(e):
+                raise Exception("Tire not available")
+            raise
+        return parse_timestamps(result.data[0])
+
+    def adjust_stock(self, adjustments):
+        """Apply many stock deltas/absolute counts in one transaction, returns the new stock levels"""
+        try:
+            return execute(supabase.rpc('adjust_stock', {'p_adjustments': adjustments})).data
+        except APIError as e:
+            if e.code == '23514':
+                raise Exception("Stock cannot become negative")
+            if 'Tires not found' in str(e):
+                raise Exception(e.message)
+            raise
+
+    def get_tires_by_ids(self, ids):
+        """Get many tires by ID, one request per batch"""
+        ids = list(ids)
+        tires = []
+        for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+            result = execute(supabase.table('tires').select('*').in_('id', ids[start:start + IMPORT_BATCH_SIZE]))
+            tires.extend(parse_timestamps(row) for row in result.data)
+        return tires
+
+    def update_tires(self, updates):
+        """Change only the named columns of many tires in one rpc call, returns the ids that existed"""
+        return [row['id'] for row in execute(supabase.rpc('update_tires', {'p_updates': updates})).data]
+
+    def delete_tires(self, ids):
+        """Delete many tires, one request per batch, returns the ids that existed"""
+        ids = list(ids)
+        deleted = []
+        for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+            result = execute(supabase.table('tires').delete().in_('id', ids[start:start + IMPORT_BATCH_SIZE]))
+            deleted.extend(row['id'] for row in result.data)
+        return deleted
+
+    def reserve_tires(self, reservations):
+        """Reserve many tires in one call and one transaction, in order"""
+        rows = execute(supabase.rpc('reserve_tires', {'p_reservations': reservations})).data
+        return [{'id': row['id'], 'remaining_stock': row['remaining_stock'] if row['id'] else None}
+                for row in sorted(rows, key=lambda row: row['item'])]
+
+    def get_reservations(self, customer_name=None, limit=None, after=None, before=None):
+        """Get all reservations, optionally filtered by customer"""
+        query = supabase.table('reservations').select('*, tires(*)')
+        if customer_name:
+            query = query.eq('customer_name', customer_name)
+        return self._keyset(query, 'reservation_date', limit, after, before)
+
+    def _search_query(self, condition=None, tire_type=None, stock_filter=None, size_filter=None):
+        """Build the filtered tires query used by listing and export without a search term"""
+        query = supabase.table('tires').select('*')
+
+        # Filter op conditie
+        if condition:
+            query = query.eq('condition', condition)
+
+        # Filter op type
+        if tire_type:
+            query = query.eq('tire_type', tire_type)
+
+        # Filter op voorraad
+        if stock_filter:
+            if stock_filter == 'in_stock':
+                query = query.gt('stock', 0)
+            elif stock_filter == 'low_stock':
+                query = query.eq('below_threshold', True).gt('stock', 0)
+            elif stock_filter == 'out_of_stock':
+                query = query.eq('stock', 0)
+
+        # Filter op maat (breedte, hoogte, velg)
+        for name, value in (size_filter or {}).items():
+            column, operator = SIZE_FILTERS[name]
+            query = query.gte(column, value) if operator == '>=' else query.lte(column, value)
+
+        return query
+
+    def _search_page(self, search, condition=None, tire_type=None, stock_filter=None, size_filter=None,
+                     limit=None, after=None, before=None):
+        """One page of ranked search results, filters and keyset applied by search_tires_page()"""
+        # Een rpc() kent geen order/limit/or_, dus alles gaat als parameter mee
+        after_rank, after_id = after or (None, None)
+        before_rank, before_id = before or (None, None)
+        params = {
+            'p_search': search,
+            'p_condition': condition or None,
+            'p_tire_type': tire_type or None,
+            'p_stock_filter': stock_filter or None,
+            'p_limit': limit,
+            'p_after_rank': cursor_value(after_rank) if after else None,
+            'p_after_id': after_id,
+            'p_before_rank': cursor_value(before_rank) if before else None,
+            'p_before_id': before_id
+        }
+        params.update({f'p_{name}': value for name, value in (size_filter or {}).items()})
+        return [parse_timestamps(row) for row in execute(supabase.rpc('search_tires_page', params)).data]
+
+    def search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                     size_filter=None, limit=None, after=None, before=None):
+        """Search and filter tires"""
+        # Zoeken in merk, maat en type via de gerangschikte trigram zoekfunctie
+        if search:
+            return self._search_page(search, condition, tire_type, stock_filter, size_filter,
+                                     limit, after, before)
+        query = self._search_query(condition, tire_type, stock_filter, size_filter)
+        return self._keyset(query, sort_column(search), limit, after, before)
+
+    def iter_search_tires(self, search=None, condition=None, tire_type=None, stock_filter=None,
+                          size_filter=None, page_size=500):
+        """Yield filtered tires page by page instead of loading them all at once"""
+        after = None
+        while True:
+            page = self.search_tires(search, condition, tire_type, stock_filter, size_filter,
+                                     limit=page_size, after=after)
+            yield from page
+            if len(page) < page_size:
+                break
+            last = page[-1]
+            after = (last[sort_column(search)], last['id'])
+
+    def get_inventory_stats(self):
+        """Get inventory statistics"""
+        # Tellingen worden in de database berekend, alleen de getallen komen terug
+        result = execute(supabase.rpc('inventory_stats', {}))
+        return result.data[0]
+
+    def get_homepage(self, limit=None, after=None, before=None):
+        """Get one page of tires (all conditions) and the inventory stats in one call"""
+        after_value, after_id = after or (None, None)
+        before_value, before_id = before or (None, None)
+        homepage = execute(supabase.rpc('homepage_tires', {
+            'p_limit': limit,
+            'p_after': after_value,
+            'p_after_id': after_id,
+            'p_before': before_value,
+            'p_before_id': before_id
+        })).data
+        homepage['tires'] = [parse_timestamps(tire) for tire in homepage['tires']]
+        return homepage
+
+    def get_catalog_version(self):
+        """Counts and latest change of tires and reservations"""
+        return execute(supabase.rpc('catalog_version', {})).data[0]
+
+    def get_low_stock(self, limit=None):
+        """Tires below their low_stock_threshold, lowest stock first (partial index)"""
+        query = supabase.table('tires').select('*').eq('below_threshold', True)
+        # Eén order parameter, zie _keyset
+        query.params = query.params.add('order', 'stock,id')
+        if limit:
+            query = query.limit(limit)
+        return [parse_timestamps(row) for row in execute(query).data]
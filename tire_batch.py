@@ -0,0 +1,278 @@
+"""
+Batch mode voor de console: opdrachten uit een bestand of stdin, gebundeld in zo min mogelijk database calls
+
+Eén opdracht per regel, velden als naam=waarde (met aanhalingstekens rond spaties):
+
+    add brand=Michelin size=205/55R16 type=zomer condition=new stock=8 price=89.99
+    edit id=12 stock=6
+    edit id=12 delta=-2
+    edit id=12 price=79.50 threshold=3
+    delete id=12
+    reserve tire=12 customer="Jan Jansen" date=2026-10-17 notes="Voor VW Golf"
+    report
+
+Opeenvolgende opdrachten van dezelfde soort gaan samen in één aanroep (en transactie), de volgorde
+tussen soorten blijft behouden: een reservering na een voorraadcorrectie ziet de nieuwe voorraad.
+"""
+
+import shlex
+import time
+from datetime import date, datetime
+from itertools import groupby
+
+from storage import IMPORT_BATCH_SIZE, LOW_STOCK_FIELDS
+from tire_import import validate_fields, validate_record
+
+COMMANDS = ('add', 'edit', 'delete', 'reserve', 'report')
+
+# Korte namen naast de veldnamen uit de import
+ALIASES = {
+    'type': 'tire_type',
+    'threshold': 'low_stock_threshold',
+    'tire': 'tire_id',
+    'customer': 'customer_name',
+    'date': 'reservation_date'
+}
+EDIT_FIELDS = ('brand', 'size', 'tire_type', 'condition', 'stock', 'price', 'low_stock_threshold')
+
+
+def parse_int(values, field, minimum=None):
+    """Required integer field, raises ValueError with a readable message"""
+    value = values.get(field)
+    if value in (None, ''):
+        raise ValueError(f"Ontbrekend veld: {field}")
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"Ongeldige {field}: {value}")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"Ongeldige {field}: {value}")
+    return number
+
+
+def parse_command(text):
+    """Parse one command line into (command, kind, data), raises ValueError"""
+    try:
+        words = shlex.split(text)
+    except ValueError as e:
+        raise ValueError(f"Ongeldige regel ({e})")
+    command = words[0].lower()
+    if command not in COMMANDS:
+        raise ValueError(f"Onbekende opdracht: {words[0]} (kies uit {', '.join(COMMANDS)})")
+
+    values = {}
+    for word in words[1:]:
+        name, separator, value = word.partition('=')
+        if not separator:
+            raise ValueError(f"Verwacht naam=waarde, niet: {word}")
+        values[ALIASES.get(name.lower(), name.lower())] = value
+
+    if command == 'add':
+        if 'id' in values:
+            raise ValueError("Een nieuwe band heeft nog geen id, gebruik edit")
+        return command, 'add', validate_record(values)
+
+    if command == 'edit':
+        tire_id = parse_int(values, 'id', minimum=1)
+        fields = {field: value for field, value in values.items() if field != 'id'}
+        unknown = set(fields) - set(EDIT_FIELDS) - {'delta'}
+        if unknown:
+            raise ValueError(f"Onbekende velden: {', '.join(sorted(unknown))}")
+        if not fields:
+            raise ValueError("Geen velden om te wijzigen")
+        # Alleen voorraad: via adjust_stock, zonder de rest van de band te overschrijven
+        if set(fields) == {'stock'}:
+            return command, 'adjust', {'tire_id': tire_id, 'stock': parse_int(fields, 'stock', minimum=0)}
+        if set(fields) == {'delta'}:
+            return command, 'adjust', {'tire_id': tire_id, 'delta': parse_int(fields, 'delta')}
+        if 'delta' in fields:
+            raise ValueError("delta kan niet samen met andere velden")
+        return command, 'update', {'id': tire_id, 'fields': fields}
+
+    if command == 'delete':
+        return command, 'delete', {'id': parse_int(values, 'id', minimum=1)}
+
+    if command == 'reserve':
+        if 'tire_id' not in values and 'id' in values:
+            values['tire_id'] = values['id']
+        reservation_date = values.get('reservation_date') or date.today().isoformat()
+        try:
+            datetime.strptime(reservation_date, '%Y-%m-%d')
+        except ValueError:
+            raise ValueError(f"Ongeldige datum: {reservation_date} (formaat YYYY-MM-DD)")
+        if not values.get('customer_name'):
+            raise ValueError("Klantnaam is verplicht")
+        return command, 'reserve', {
+            'tire_id': parse_int(values, 'tire_id', minimum=1),
+            'customer_name': values['customer_name'],
+            'reservation_date': reservation_date,
+            'notes': values.get('notes', '')
+        }
+
+    return command, 'report', {}
+
+
+def parse_commands(lines):
+    """Parse command lines, returns (commands, errors); blank lines and # comments are skipped"""
+    commands = []
+    errors = []
+    for number, text in enumerate(lines, start=1):
+        text = text.strip()
+        if not text or text.startswith('#'):
+            continue
+        try:
+            command, kind, data = parse_command(text)
+        except ValueError as e:
+            errors.append({'line': number, 'command': text.split()[0].lower(), 'ok': False, 'error': str(e)})
+            continue
+        commands.append({'line': number, 'command': command, 'kind': kind, 'data': data})
+    return commands, errors
+
+
+class BatchRunner:
+    """Run parsed commands in order, consecutive commands of the same kind as one batched call"""
+
+    def __init__(self, storage, batch_size=IMPORT_BATCH_SIZE):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.calls = 0
+
+    def call(self, method, *args):
+        """Call a storage method and count it"""
+        self.calls += 1
+        return method(*args)
+
+    def run(self, commands, errors=()):
+        """Run all commands, returns the summary dict (results ordered by line)"""
+        started = time.perf_counter()
+        results = list(errors)
+        for kind, group in groupby(commands, key=lambda command: command['kind']):
+            group = list(group)
+            for start in range(0, len(group), self.batch_size):
+                batch = group[start:start + self.batch_size]
+                try:
+                    outcomes = getattr(self, f'run_{kind}')(batch)
+                except Exception as e:
+                    # Eén aanroep per batch: bij een fout is niets uit deze batch doorgevoerd
+                    outcomes = [{'error': str(e)}] * len(batch)
+                for command, outcome in zip(batch, outcomes):
+                    results.append({'line': command['line'], 'command': command['command'],
+                                    'ok': 'error' not in outcome, **outcome})
+
+        results.sort(key=lambda result: result['line'])
+        failed = sum(1 for result in results if not result['ok'])
+        return {
+            'ok': not failed,
+            'total': len(results),
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'calls': self.calls,
+            'seconds': round(time.perf_counter() - started, 3),
+            'results': results
+        }
+
+    def run_add(self, batch):
+        """All new tires in one import (one transaction), each line gets its new id"""
+        report = self.call(self.storage.import_tires, [(command['line'], command['data']) for command in batch])
+        return [{'id': tire_id} for tire_id in report['ids']]
+
+    def run_adjust(self, batch):
+        """Stock changes: unknown ids and negative stock per command, the rest in one adjust_stock call"""
+        ids = {command['data']['tire_id'] for command in batch}
+        current = {tire['id']: tire['stock'] for tire in self.call(self.storage.get_tires_by_ids, ids)}
+
+        # Per band samenvoegen: een absolute voorraad vervangt alles ervoor, delta's tellen op
+        adjustments = {}
+        outcomes = []
+        for command in batch:
+            data = command['data']
+            tire_id = data['tire_id']
+            if tire_id not in current:
+                outcomes.append({'error': f"Band met ID {tire_id} bestaat niet"})
+                continue
+            absolute, delta = adjustments.get(tire_id, (None, 0))
+            if 'stock' in data:
+                absolute, delta = data['stock'], 0
+            else:
+                delta += data['delta']
+            stock = (current[tire_id] if absolute is None else absolute) + delta
+            if stock < 0:
+                outcomes.append({'error': f"Voorraad kan niet negatief worden ({stock})"})
+                continue
+            adjustments[tire_id] = (absolute, delta)
+            outcomes.append({'stock': stock})
+
+        if adjustments:
+            # Delta's blijven delta's, zodat gelijktijdige reserveringen niet overschreven worden
+            tires = self.call(self.storage.adjust_stock, [
+                {'tire_id': tire_id, 'stock': absolute + delta} if absolute is not None
+                else {'tire_id': tire_id, 'delta': delta}
+                for tire_id, (absolute, delta) in adjustments.items()
+            ])
+            # De laatste opdracht per band krijgt de voorraad die de database teruggeeft
+            final = {tire['id']: tire['stock'] for tire in tires}
+            for command, outcome in reversed(list(zip(batch, outcomes))):
+                if 'stock' in outcome and command['data']['tire_id'] in final:
+                    outcome['stock'] = final.pop(command['data']['tire_id'])
+        return outcomes
+
+    def run_update(self, batch):
+        """Edits of other fields: fetch the tires once to validate, write only the named fields in one call"""
+        ids = {command['data']['id'] for command in batch}
+        current = {tire['id']: tire for tire in self.call(self.storage.get_tires_by_ids, ids)}
+
+        # Meerdere edits van dezelfde band bouwen op elkaar voort
+        merged = {}
+        named = {}
+        outcomes = []
+        for command in batch:
+            tire_id = command['data']['id']
+            base = merged.get(tire_id) or current.get(tire_id)
+            if base is None:
+                outcomes.append({'error': f"Band met ID {tire_id} bestaat niet"})
+                continue
+            # Alleen de genoemde velden valideren: een opgeslagen maat die niet aan SIZE_PATTERN voldoet
+            # (vrije tekst uit het web formulier) mag een prijs of merk wijziging niet blokkeren
+            try:
+                merged[tire_id] = {**base, **validate_fields(command['data']['fields'])}
+            except ValueError as e:
+                outcomes.append({'error': str(e)})
+                continue
+            named.setdefault(tire_id, set()).update(command['data']['fields'])
+            outcomes.append({})
+
+        if named:
+            # Alleen de genoemde velden: een opgehaalde (intussen verouderde) voorraad gaat niet terug
+            # naar de database en overschrijft dus geen gelijktijdige reservering
+            updated = set(self.call(self.storage.update_tires, [
+                {'id': tire_id, **{field: merged[tire_id][field] for field in fields}}
+                for tire_id, fields in named.items()
+            ]))
+            # Tussen ophalen en bijwerken verwijderd: die edits alsnog als fout melden
+            for command, outcome in zip(batch, outcomes):
+                if command['data']['id'] not in updated and 'error' not in outcome:
+                    outcome['error'] = f"Band met ID {command['data']['id']} bestaat niet"
+        return outcomes
+
+    def run_delete(self, batch):
+        """All deletes in one call"""
+        deleted = set(self.call(self.storage.delete_tires, [command['data']['id'] for command in batch]))
+        return [{} if command['data']['id'] in deleted
+                else {'error': f"Band met ID {command['data']['id']} bestaat niet"}
+                for command in batch]
+
+    def run_reserve(self, batch):
+        """All reservations in one call and one transaction, in order"""
+        reservations = self.call(self.storage.reserve_tires, [command['data'] for command in batch])
+        return [{'id': reservation['id'], 'remaining_stock': reservation['remaining_stock']} if reservation['id']
+                else {'error': f"Band met ID {command['data']['tire_id']} niet op voorraad"}
+                for command, reservation in zip(batch, reservations)]
+
+    def run_report(self, batch):
+        """Inventory stats and the low-stock list, once for consecutive reports"""
+        report = {
+            'stats': self.call(self.storage.get_inventory_stats),
+            'low_stock': [{field: tire[field] for field in LOW_STOCK_FIELDS}
+                          for tire in self.call(self.storage.get_low_stock)]
+        }
+        return [report] * len(batch)
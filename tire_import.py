@@ -0,0 +1,168 @@
+"""
+Inlezen en valideren van CSV/JSON bestanden voor de bulk import
+"""
+
+import csv
+import json
+import re
+from io import StringIO
+
+from storage import LOW_STOCK_THRESHOLD
+
+# Zelfde kolommen als export_inventory, zodat een export direct terug te importeren is
+IMPORT_COLUMNS = {
+    'ID': 'id',
+    'Merk': 'brand',
+    'Maat': 'size',
+    'Type': 'tire_type',
+    'Conditie': 'condition',
+    'Voorraad': 'stock',
+    'Prijs': 'price',
+    'Drempel': 'low_stock_threshold'
+}
+REQUIRED_FIELDS = ('brand', 'size', 'tire_type', 'condition', 'stock')
+SIZE_PATTERN = re.compile(r'^\d{3}/\d{2}R\d{2}( \d{2,3}[A-Z])?$')
+TIRE_TYPES = ('zomer', 'winter', 'all_season')
+CONDITIONS = {'new': 'new', 'nieuw': 'new', 'used': 'used', 'tweedehands': 'used'}
+TIRE_FIELDS = ('brand', 'size', 'tire_type', 'condition', 'stock', 'price', 'low_stock_threshold')
+
+
+def read_records(content, filename=''):
+    """Parse CSV or JSON text into a list of raw records"""
+    content = content.lstrip('\ufeff')
+    if filename.lower().endswith('.json') or content.lstrip().startswith(('[', '{')):
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            raise Exception(f"Ongeldige JSON: {e}")
+        if isinstance(data, dict):
+            data = data.get('tires')
+        if not isinstance(data, list):
+            raise Exception("JSON moet een lijst met banden bevatten")
+        return data
+
+    reader = csv.DictReader(StringIO(content))
+    if not reader.fieldnames:
+        raise Exception("Leeg bestand")
+    return list(reader)
+
+
+def clean_field(field, value):
+    """Normalise one tire field, raises ValueError when the value is invalid"""
+    if field == 'brand':
+        brand = str(value)
+        if len(brand) > 100:
+            raise ValueError("Merk is te lang (max 100 tekens)")
+        return brand
+
+    if field == 'size':
+        size = str(value).upper()
+        if not SIZE_PATTERN.match(size):
+            raise ValueError(f"Ongeldige maat: {value} (formaat xxx/xxRxx)")
+        return size
+
+    if field == 'tire_type':
+        tire_type = str(value).lower().replace(' ', '_')
+        if tire_type not in TIRE_TYPES:
+            raise ValueError(f"Ongeldig type: {value}")
+        return tire_type
+
+    if field == 'condition':
+        condition = CONDITIONS.get(str(value).lower())
+        if not condition:
+            raise ValueError(f"Ongeldige conditie: {value}")
+        return condition
+
+    if field == 'stock':
+        try:
+            stock = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Ongeldige voorraad: {value}")
+        if stock < 0:
+            raise ValueError(f"Ongeldige voorraad: {value}")
+        return stock
+
+    if field == 'price':
+        if value in (None, ''):
+            return None
+        try:
+            price = round(float(str(value).replace('€', '').replace(',', '.').strip()), 2)
+        except ValueError:
+            raise ValueError(f"Ongeldige prijs: {value}")
+        if price < 0:
+            raise ValueError(f"Ongeldige prijs: {value}")
+        return price
+
+    if field == 'low_stock_threshold':
+        # Zonder drempel kolom (oudere exports) geldt de standaard drempel
+        if value in (None, ''):
+            return LOW_STOCK_THRESHOLD
+        try:
+            threshold = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Ongeldige drempel: {value}")
+        if threshold < 0:
+            raise ValueError(f"Ongeldige drempel: {value}")
+        return threshold
+
+    raise ValueError(f"Onbekend veld: {field}")
+
+
+def validate_fields(fields):
+    """Validate only the given tire fields, returns them normalised or raises ValueError"""
+    values = {field: value.strip() if isinstance(value, str) else value for field, value in fields.items()}
+    missing = [field for field in REQUIRED_FIELDS if field in values and values[field] in (None, '')]
+    if missing:
+        raise ValueError(f"Ontbrekende velden: {', '.join(missing)}")
+    return {field: clean_field(field, value) for field, value in values.items()}
+
+
+def validate_record(record):
+    """Validate one record, returns the tire dict or raises ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError("Geen geldig record")
+
+    # Export kolomnamen en veldnamen (brand, size, ...) zijn allebei toegestaan
+    values = {}
+    for key, value in record.items():
+        if key is None:
+            raise ValueError("Te veel kolommen")
+        field = IMPORT_COLUMNS.get(key.strip(), key.strip())
+        values[field] = value.strip() if isinstance(value, str) else value
+
+    missing = [field for field in REQUIRED_FIELDS if values.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Ontbrekende velden: {', '.join(missing)}")
+
+    tire = {}
+    if values.get('id') not in (None, ''):
+        try:
+            tire['id'] = int(values['id'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Ongeldig ID: {values['id']}")
+        if tire['id'] <= 0:
+            raise ValueError(f"Ongeldig ID: {values['id']}")
+
+    for field in TIRE_FIELDS:
+        tire[field] = clean_field(field, values.get(field))
+
+    return tire
+
+
+def parse_import(content, filename=''):
+    """Validate a whole file, returns (rows, errors) with rows as (row number, tire) pairs"""
+    rows = []
+    errors = []
+    seen_ids = set()
+    for number, record in enumerate(read_records(content, filename), start=1):
+        try:
+            tire = validate_record(record)
+            if 'id' in tire:
+                if tire['id'] in seen_ids:
+                    raise ValueError(f"ID {tire['id']} komt meerdere keren voor")
+                seen_ids.add(tire['id'])
+        except ValueError as e:
+            errors.append({'row': number, 'error': str(e)})
+            continue
+        rows.append((number, tire))
+    return rows, errors